@@ -2,6 +2,7 @@ import UserInteraction from "../models/UserInteraction.js";
 import UserPreference from "../models/UserPreference.js";
 import Booking from "../models/Booking.js";
 import { createError } from "../utils/error.js";
+import { pushInteraction } from "../utils/interactionStream.js";
 
 // Track user interaction (view, click, search, etc.)
 export const trackInteraction = async (req, res, next) => {
@@ -37,6 +38,7 @@ export const trackInteraction = async (req, res, next) => {
         });
 
         await interaction.save();
+        pushInteraction(interaction);
         
         // Update user preferences based on interaction
         if (userId && interactionType === 'view') {
@@ -189,6 +191,7 @@ export const createBooking = async (req, res, next) => {
                 }
             });
             await interaction.save();
+            pushInteraction(interaction);
         }
         
         res.status(200).json(savedBooking);
@@ -138,14 +138,34 @@ export const retrainModels = async (req, res, next) => {
     try {
         const { model_type = 'all' } = req.body;
         
-        // Call ML service
+        // Call ML service (retraining runs in the background there)
         const mlResponse = await axios.post(`${ML_SERVICE_URL}/models/retrain`, {
             model_type
         });
         
+        res.status(202).json({
+            message: "Model retraining started",
+            job: mlResponse.data.job
+        });
+        
+    } catch (error) {
+        if (error.response) {
+            return next(createError(error.response.status, error.response.data.error));
+        }
+        next(error);
+    }
+};
+
+// Get ML model retrain job status
+export const getRetrainStatus = async (req, res, next) => {
+    try {
+        const { jobId } = req.params;
+        
+        // Call ML service
+        const mlResponse = await axios.get(`${ML_SERVICE_URL}/models/retrain/${jobId}`);
+        
         res.status(200).json({
-            message: "Models retrained successfully",
-            result: mlResponse.data.result
+            job: mlResponse.data.job
         });
         
     } catch (error) {
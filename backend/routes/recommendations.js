@@ -5,6 +5,7 @@ import {
     getTrendingHotels,
     getUserProfile,
     retrainModels,
+    getRetrainStatus,
     getHomePageRecommendations,
     getEnhancedHotelSearch
 } from "../controllers/recommendation.js";
@@ -33,4 +34,7 @@ router.get("/search", getEnhancedHotelSearch);
 // ROUTE 7: Retrain ML models using POST "/api/recommendations/retrain" (Admin only)
 router.post("/retrain", verifyAdmin, retrainModels);
 
+// ROUTE 8: Get ML model retrain job status using GET "/api/recommendations/retrain/:jobId" (Admin only)
+router.get("/retrain/:jobId", verifyAdmin, getRetrainStatus);
+
 export default router;
@@ -0,0 +1,52 @@
+import axios from "axios";
+
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:5000';
+// Trending counters, popularity, cached profiles and behavior summaries live in each ML worker's
+// memory, and a POST reaches only one worker behind a load balancer. With several workers, list
+// every worker's address here so each batch is sent to all of them; otherwise the workers that
+// miss a batch only catch up at their next recount or cache expiry.
+const ML_INGEST_URLS = (process.env.ML_INGEST_URLS || ML_SERVICE_URL)
+    .split(',')
+    .map((url) => url.trim())
+    .filter(Boolean);
+const BATCH_SIZE = parseInt(process.env.INTERACTION_BATCH_SIZE) || 100;
+const FLUSH_INTERVAL_MS = parseInt(process.env.INTERACTION_FLUSH_MS) || 1000;
+
+let pending = [];
+let flushTimer = null;
+
+// Send queued interactions to the ML service in one request
+const flushInteractions = async () => {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+
+    const events = pending;
+    pending = [];
+    if (events.length === 0) return;
+
+    const results = await Promise.allSettled(
+        ML_INGEST_URLS.map((url) => axios.post(`${url}/interactions/ingest`, { events }))
+    );
+    results.forEach((result, i) => {
+        if (result.status === 'rejected') {
+            // The ML service recounts from MongoDB periodically, so dropped events are recovered
+            console.error(`Error pushing interactions to ML service at ${ML_INGEST_URLS[i]}:`, result.reason.message);
+        }
+    });
+};
+
+// Queue a saved interaction for the ML service's trending counters
+export const pushInteraction = (interaction) => {
+    pending.push({
+        userId: interaction.userId,
+        hotelId: interaction.hotelId,
+        interactionType: interaction.interactionType,
+        createdAt: interaction.createdAt
+    });
+
+    if (pending.length >= BATCH_SIZE) {
+        flushInteractions();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flushInteractions, FLUSH_INTERVAL_MS);
+    }
+};
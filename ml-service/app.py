@@ -1,15 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import logging
 from recommendation_engine import RecommendationEngine
+from job_runner import JobRunner
+from serialization import OrjsonProvider, dumps, parse_fields, select_hotel_fields
+from flight_recorder import FlightRecorder, profiled_inputs
+import metrics
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Configure logging
@@ -18,12 +23,90 @@ logger = logging.getLogger(__name__)
 
 # Initialize recommendation engine
 rec_engine = RecommendationEngine()
+jobs = JobRunner()
+recorder = FlightRecorder(
+    enabled=os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    threshold_ms=float(os.getenv('PROFILE_THRESHOLD_MS', 500)),
+    interval_ms=float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)),
+    capacity=int(os.getenv('PROFILE_CAPTURES', 50))
+)
+recorder.start()
+
+def retrain_stale_models():
+    """Queue a retrain job for each model the engine found stale at startup"""
+    # Every worker finds the same stale models; whichever trains first commits them for the rest
+    for model_type in rec_engine.claim_stale_models():
+        jobs.submit('retrain', rec_engine.retrain_models, model_type=model_type, stale_only=True)
+
+# A lazy start still trains right away when there is no model to serve at all
+if rec_engine.startup_mode != 'lazy' or not rec_engine.ready:
+    retrain_stale_models()
+
+@app.before_request
+def begin_request_metrics():
+    g.metrics_request = metrics.begin_request()
+
+@app.after_request
+def end_request_metrics(response):
+    state = g.pop('metrics_request', None)
+    if state is not None:
+        # Finish once the body has been sent, so streamed responses are measured to the end
+        endpoint = request.endpoint
+        response.call_on_close(lambda: metrics.end_request(state, endpoint))
+    return response
+
+@app.before_request
+def begin_request_profile():
+    if not recorder.enabled:
+        return
+    inputs = profiled_inputs(request.args.to_dict(), request.get_json(silent=True))
+    forced = request.headers.get('X-Profile-Request', '').lower() in ('1', 'true', 'yes')
+    g.request_profile = recorder.begin(inputs, forced=forced)
+
+@app.after_request
+def end_request_profile(response):
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        # Finish once the body has been sent, so streamed responses are profiled to the end
+        endpoint, method, path = request.endpoint, request.method, request.path
+        response.call_on_close(
+            lambda: recorder.finish(profile, endpoint, method, path, response.status_code)
+        )
+    return response
+
+@app.before_request
+def retrain_stale_models_lazily():
+    """Start the deferred retrain of stale models on the first request that isn't a probe"""
+    if rec_engine.stale_models and request.endpoint not in ('health_check', 'readiness_check'):
+        retrain_stale_models()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "service": "ML Recommendation Service"})
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for pipeline stages, Mongo commands, requests and training"""
+    if not metrics.registry.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 503 until models are loaded or the first training has finished"""
+    snapshot = rec_engine.snapshot
+    
+    if not rec_engine.ready:
+        return jsonify({"status": "loading"}), 503
+    
+    return jsonify({
+        "status": "ready",
+        "model_version": snapshot.version,
+        "trained_at": snapshot.created_at.isoformat()
+    })
+
 @app.route('/recommendations/personalized', methods=['POST'])
 def get_personalized_recommendations():
     """Get personalized hotel recommendations for a user"""
@@ -32,6 +115,7 @@ def get_personalized_recommendations():
         user_id = data.get('userId')
         limit = data.get('limit', 10)
         filters = data.get('filters', {})
+        fields = parse_fields(data.get('fields'))
         
         if not user_id:
             return jsonify({"error": "userId is required"}), 400
@@ -42,16 +126,77 @@ def get_personalized_recommendations():
             filters=filters
         )
         
+        recommendations = select_hotel_fields(recommendations, fields)
+        
         return jsonify({
             "recommendations": recommendations,
             "total": len(recommendations),
-            "userId": user_id
+            "userId": user_id,
+            "model_version": rec_engine.model_version
         })
         
     except Exception as e:
         logger.error(f"Error getting personalized recommendations: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/recommendations/personalized/batch', methods=['POST'])
+def get_batch_personalized_recommendations():
+    """Get personalized hotel recommendations for many users, streamed as NDJSON"""
+    try:
+        data = request.get_json()
+        user_ids = data.get('userIds')
+        limit = data.get('limit', 10)
+        filters = data.get('filters', {})
+        fields = parse_fields(data.get('fields'))
+        
+        if not user_ids or not isinstance(user_ids, list):
+            return jsonify({"error": "userIds must be a non-empty list"}), 400
+        
+        def generate():
+            for result in rec_engine.get_batch_personalized_recommendations(
+                user_ids=user_ids,
+                limit=limit,
+                filters=filters
+            ):
+                if 'recommendations' in result:
+                    result['recommendations'] = select_hotel_fields(result['recommendations'], fields)
+                yield dumps(result) + b'\n'
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'X-Model-Version': rec_engine.model_version}
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting batch personalized recommendations: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/recommendations/precompute', methods=['POST'])
+def precompute_recommendations():
+    """Start precomputing recommendations for recently active users in the background"""
+    try:
+        job = jobs.submit('precompute', rec_engine.precompute_recommendations)
+        
+        return jsonify({
+            "message": "Recommendation precomputation started",
+            "job": job
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error starting recommendation precomputation: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/recommendations/precompute/<job_id>', methods=['GET'])
+def get_precompute_job(job_id):
+    """Get the status of a recommendation precomputation job"""
+    job = jobs.get(job_id)
+    
+    if job is None or job['job_type'] != 'precompute':
+        return jsonify({"error": "Precompute job not found"}), 404
+    
+    return jsonify({"job": job})
+
 @app.route('/recommendations/similar', methods=['POST'])
 def get_similar_hotels():
     """Get hotels similar to a given hotel"""
@@ -59,6 +204,7 @@ def get_similar_hotels():
         data = request.get_json()
         hotel_id = data.get('hotelId')
         limit = data.get('limit', 5)
+        fields = parse_fields(data.get('fields'))
         
         if not hotel_id:
             return jsonify({"error": "hotelId is required"}), 400
@@ -68,10 +214,13 @@ def get_similar_hotels():
             limit=limit
         )
         
+        similar_hotels = select_hotel_fields(similar_hotels, fields)
+        
         return jsonify({
             "similar_hotels": similar_hotels,
             "total": len(similar_hotels),
-            "hotelId": hotel_id
+            "hotelId": hotel_id,
+            "model_version": rec_engine.model_version
         })
         
     except Exception as e:
@@ -84,38 +233,103 @@ def get_trending_hotels():
     try:
         limit = request.args.get('limit', 10, type=int)
         city = request.args.get('city')
+        fields = parse_fields(request.args.get('fields'))
         
         trending_hotels = rec_engine.get_trending_hotels(
             limit=limit,
             city=city
         )
         
+        trending_hotels = select_hotel_fields(trending_hotels, fields)
+        
         return jsonify({
             "trending_hotels": trending_hotels,
-            "total": len(trending_hotels)
+            "total": len(trending_hotels),
+            "model_version": rec_engine.model_version
         })
         
     except Exception as e:
         logger.error(f"Error getting trending hotels: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/interactions/ingest', methods=['POST'])
+def ingest_interactions():
+    """Fold a batch of newly tracked interactions into the in-memory counters"""
+    try:
+        data = request.get_json(silent=True) or {}
+        events = data.get('events')
+        
+        if not isinstance(events, list):
+            return jsonify({"error": "events must be a list"}), 400
+        
+        return jsonify(rec_engine.ingest_interactions(events))
+        
+    except Exception as e:
+        logger.error(f"Error ingesting interactions: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route('/models/retrain', methods=['POST'])
 def retrain_models():
-    """Retrain ML models with latest data"""
+    """Start retraining ML models with latest data in the background"""
     try:
-        model_type = request.get_json().get('model_type', 'all')
+        data = request.get_json(silent=True) or {}
+        model_type = data.get('model_type', 'all')
+        
+        if model_type not in ['all', 'content', 'collaborative', 'mf']:
+            return jsonify({"error": f"Unknown model_type: {model_type}"}), 400
         
-        result = rec_engine.retrain_models(model_type)
+        job = jobs.submit('retrain', rec_engine.retrain_models, model_type=model_type)
         
         return jsonify({
-            "message": "Models retrained successfully",
-            "result": result
-        })
+            "message": "Model retraining started",
+            "job": job
+        }), 202
         
     except Exception as e:
         logger.error(f"Error retraining models: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/models/retrain/<job_id>', methods=['GET'])
+def get_retrain_job(job_id):
+    """Get the status of a retrain job"""
+    job = jobs.get(job_id)
+    
+    if job is None or job['job_type'] != 'retrain':
+        return jsonify({"error": "Retrain job not found"}), 404
+    
+    return jsonify({"job": job})
+
+@app.route('/models/status', methods=['GET'])
+def get_model_status():
+    """Get the serving model version and recent retrain jobs"""
+    snapshot = rec_engine.snapshot
+    
+    return jsonify({
+        "model_version": snapshot.version,
+        "trained_at": snapshot.created_at.isoformat(),
+        "collaborative_backend": snapshot.collaborative_backend,
+        "ready": rec_engine.ready,
+        "startup_mode": rec_engine.startup_mode,
+        "jobs": jobs.list()
+    })
+
+@app.route('/admin/slow-requests', methods=['GET'])
+def get_slow_requests():
+    """Profiles of recent slow requests, as JSON or as collapsed stacks (?format=collapsed)"""
+    if not recorder.enabled:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    
+    captures = recorder.captures(request.args.get('id'))
+    
+    if request.args.get('format') == 'collapsed':
+        return Response(recorder.collapsed(captures), mimetype='text/plain')
+    
+    return jsonify({
+        "threshold_ms": recorder.threshold_ms,
+        "captures": captures,
+        "total": len(captures)
+    })
+
 @app.route('/analytics/user-profile', methods=['POST'])
 def get_user_profile():
     """Get user profile analysis for recommendations"""
@@ -0,0 +1,209 @@
+"""ASGI serving mode for the ML service.
+
+The request-path endpoints are served by Quart handlers on top of
+AsyncRecommendationService, so a worker keeps many requests in flight while
+they wait on Mongo. Every other route (jobs, ingestion, status, analytics)
+is passed through to the Flask app unchanged.
+
+Run with: hypercorn asgi_app:application --bind 0.0.0.0:5000
+"""
+import os
+import asyncio
+import logging
+
+from quart import Quart, request, jsonify, Response, g
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from werkzeug.exceptions import HTTPException
+
+from app import app as flask_app, rec_engine, retrain_stale_models
+from async_service import AsyncRecommendationService
+from serialization import OrjsonProvider, dumps, parse_fields, select_hotel_fields
+import metrics
+
+logger = logging.getLogger(__name__)
+
+async_app = Quart(__name__)
+async_app.json = OrjsonProvider(async_app)
+service = AsyncRecommendationService(rec_engine, max_workers=int(os.getenv('ASYNC_SCORING_WORKERS', 0)) or None)
+wsgi_app = AsyncioWSGIMiddleware(flask_app)
+
+@async_app.before_serving
+async def start_service():
+    service.start()
+
+@async_app.after_serving
+async def stop_service():
+    await service.stop()
+
+class MetricsBody:
+    """Response body wrapper that finishes request metrics once the body has been sent"""
+
+    def __init__(self, body, state, endpoint):
+        self.body = body
+        self.state = state
+        self.endpoint = endpoint
+
+    async def __aenter__(self):
+        return await self.body.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        try:
+            await self.body.__aexit__(exc_type, exc_value, tb)
+        finally:
+            metrics.end_request(self.state, self.endpoint)
+
+@async_app.before_request
+async def begin_request_metrics():
+    g.metrics_request = metrics.begin_request()
+
+@async_app.after_request
+async def end_request_metrics(response):
+    state = g.pop('metrics_request', None)
+    if state is not None:
+        # Streamed bodies are generated after this hook, so measure to the end of the body
+        response.response = MetricsBody(response.response, state, request.endpoint)
+    return response
+
+@async_app.before_request
+async def retrain_stale_models_lazily():
+    """Start the deferred retrain of stale models on the first request, as the Flask app does for its routes"""
+    if rec_engine.stale_models:
+        retrain_stale_models()
+
+@async_app.route('/recommendations/personalized', methods=['POST'])
+async def get_personalized_recommendations():
+    """Get personalized hotel recommendations for a user"""
+    try:
+        data = await request.get_json()
+        user_id = data.get('userId')
+        limit = data.get('limit', 10)
+        filters = data.get('filters', {})
+        fields = parse_fields(data.get('fields'))
+
+        if not user_id:
+            return jsonify({"error": "userId is required"}), 400
+
+        recommendations = await service.get_personalized_recommendations(
+            user_id=user_id,
+            limit=limit,
+            filters=filters
+        )
+
+        recommendations = select_hotel_fields(recommendations, fields)
+
+        return jsonify({
+            "recommendations": recommendations,
+            "total": len(recommendations),
+            "userId": user_id,
+            "model_version": rec_engine.model_version
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting personalized recommendations: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@async_app.route('/recommendations/personalized/batch', methods=['POST'])
+async def get_batch_personalized_recommendations():
+    """Get personalized hotel recommendations for many users, streamed as NDJSON"""
+    try:
+        data = await request.get_json()
+        user_ids = data.get('userIds')
+        limit = data.get('limit', 10)
+        filters = data.get('filters', {})
+        fields = parse_fields(data.get('fields'))
+
+        if not user_ids or not isinstance(user_ids, list):
+            return jsonify({"error": "userIds must be a non-empty list"}), 400
+
+        async def generate():
+            async for result in service.get_batch_personalized_recommendations(
+                user_ids=user_ids,
+                limit=limit,
+                filters=filters
+            ):
+                if 'recommendations' in result:
+                    result['recommendations'] = select_hotel_fields(result['recommendations'], fields)
+                yield dumps(result) + b'\n'
+
+        return Response(
+            generate(),
+            mimetype='application/x-ndjson',
+            headers={'X-Model-Version': rec_engine.model_version}
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting batch personalized recommendations: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@async_app.route('/recommendations/similar', methods=['POST'])
+async def get_similar_hotels():
+    """Get hotels similar to a given hotel"""
+    try:
+        data = await request.get_json()
+        hotel_id = data.get('hotelId')
+        limit = data.get('limit', 5)
+        fields = parse_fields(data.get('fields'))
+
+        if not hotel_id:
+            return jsonify({"error": "hotelId is required"}), 400
+
+        similar_hotels = await service.run(rec_engine.get_similar_hotels, hotel_id=hotel_id, limit=limit)
+
+        similar_hotels = select_hotel_fields(similar_hotels, fields)
+
+        return jsonify({
+            "similar_hotels": similar_hotels,
+            "total": len(similar_hotels),
+            "hotelId": hotel_id,
+            "model_version": rec_engine.model_version
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting similar hotels: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@async_app.route('/recommendations/trending', methods=['GET'])
+async def get_trending_hotels():
+    """Get trending hotels based on recent interactions"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        city = request.args.get('city')
+        fields = parse_fields(request.args.get('fields'))
+
+        trending_hotels = await service.run(rec_engine.get_trending_hotels, limit=limit, city=city)
+
+        trending_hotels = select_hotel_fields(trending_hotels, fields)
+
+        return jsonify({
+            "trending_hotels": trending_hotels,
+            "total": len(trending_hotels),
+            "model_version": rec_engine.model_version
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting trending hotels: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def _is_async_route(scope) -> bool:
+    adapter = async_app.url_map.bind('localhost')
+    try:
+        adapter.match(scope['path'], method=scope['method'])
+        return True
+    except HTTPException:
+        return False
+
+async def application(scope, receive, send):
+    """ASGI entry point: Quart for the async routes, the Flask app for the rest"""
+    if scope['type'] == 'http' and not _is_async_route(scope):
+        await wsgi_app(scope, receive, send)
+    else:
+        await async_app(scope, receive, send)
+
+if __name__ == '__main__':
+    config = Config()
+    config.bind = [f"0.0.0.0:{int(os.getenv('ML_SERVICE_PORT', 5000))}"]
+
+    logger.info(f"Starting async ML Recommendation Service on {config.bind[0]}")
+    asyncio.run(serve(application, config))
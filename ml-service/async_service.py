@@ -0,0 +1,151 @@
+import os
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import pymongo
+from bson import ObjectId
+
+import metrics
+from model_snapshot import ModelSnapshot
+from recommendation_engine import PROFILE_INTERACTION_FIELDS, PROFILE_INTERACTIONS, RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRecommendationService:
+    """Asyncio front end of a RecommendationEngine for the ASGI serving mode.
+
+    Request-path Mongo reads go through the async driver, so a request waiting
+    on the database does not hold a thread, and the independent lookups of one
+    request run concurrently. Scoring against the engine's in-memory models,
+    and engine calls that are still synchronous, run on a thread pool so they
+    never block the event loop.
+    """
+
+    def __init__(self, engine: RecommendationEngine, max_workers: Optional[int] = None):
+        self.engine = engine
+        self.max_workers = max_workers or os.cpu_count()
+        self.client = None
+        self.db = None
+        self.executor = None
+
+    def start(self):
+        """Open the async Mongo client; call from within the serving event loop"""
+        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/booking-app')
+        self.client = pymongo.AsyncMongoClient(mongo_uri, event_listeners=metrics.event_listeners())
+        self.db = self.client.get_default_database()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scoring')
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run a blocking call on the scoring pool, in the caller's context so per-request metrics follow it"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, partial(context.run, func, *args, **kwargs))
+
+    async def get_personalized_recommendations(self, user_id: str, limit: int = 10,
+                                               filters: Dict = None) -> List[Dict]:
+        """Async get_personalized_recommendations with the same results as the engine's"""
+        try:
+            engine = self.engine
+            snapshot = engine.snapshot
+
+            if not snapshot.has_content_model:
+                return await self.run(engine.get_personalized_recommendations, user_id, limit, filters)
+
+            # The profile is only needed to score live, so it isn't fetched for precomputed hits
+            entry = await self._find_precomputed(user_id, snapshot.version)
+            if entry is not None:
+                hotels = await self.get_hotels(rec['hotelId'] for rec in entry['recommendations'])
+                precomputed = engine._precomputed_results(entry, hotels, limit, filters)
+                if precomputed is not None:
+                    return precomputed
+
+            profiles = await self._get_user_profiles(snapshot, [user_id])
+            results = await self._rank_and_hydrate(snapshot, [user_id], profiles, limit, filters)
+            return results.get(user_id, [])
+
+        except Exception as e:
+            logger.error(f"Error getting personalized recommendations: {str(e)}")
+            return []
+
+    async def get_batch_personalized_recommendations(self, user_ids: List[str], limit: int = 10,
+                                                     filters: Dict = None) -> AsyncIterator[Dict]:
+        """Async get_batch_personalized_recommendations, yielding one result per user"""
+        engine = self.engine
+        snapshot = engine.snapshot
+        chunk_size = int(os.getenv('BATCH_CHUNK_SIZE', 64))
+
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            valid_ids = [str(user_id) for user_id in chunk if ObjectId.is_valid(str(user_id))]
+
+            try:
+                if not snapshot.has_content_model:
+                    results = await self.run(engine._get_batch_chunk_recommendations, snapshot, valid_ids, limit, filters)
+                else:
+                    profiles = await self._get_user_profiles(snapshot, valid_ids)
+                    results = await self._rank_and_hydrate(snapshot, valid_ids, profiles, limit, filters)
+            except Exception as e:
+                logger.error(f"Error getting batch recommendations: {str(e)}")
+                results = {}
+
+            for result in engine._batch_chunk_results(chunk, valid_ids, results):
+                yield result
+
+    async def get_hotels(self, hotel_ids) -> Dict[str, Dict]:
+        """Hotel documents keyed by string id, through the engine's hotel cache"""
+        return await self.engine.hotel_store.get_many_async(self.db.hotels, hotel_ids)
+
+    async def _find_precomputed(self, user_id: str, model_version: str) -> Optional[Dict]:
+        try:
+            query = self.engine.recommendation_store.fresh_query(user_id, model_version)
+            with metrics.stage('precomputed'):
+                return await self.db.precomputedrecommendations.find_one(query)
+        except Exception as e:
+            logger.error(f"Error reading precomputed recommendations: {str(e)}")
+            return None
+
+    async def _get_user_profiles(self, snapshot: ModelSnapshot, user_ids: List[str]) -> Dict:
+        """Profiles for users, fetching the cache misses' preferences and interactions concurrently"""
+        engine = self.engine
+        with metrics.stage('profile'):
+            profiles, missing = engine._cached_user_profiles(snapshot, user_ids)
+            if not missing:
+                return profiles
+
+            preferences_query, interactions_query, interactions_pipeline = engine._profile_queries(missing)
+            preferences, interactions = await asyncio.gather(
+                self.db.userpreferences.find(preferences_query).to_list(None),
+                self._recent_interactions(interactions_query, interactions_pipeline)
+            )
+
+            profiles.update(await self.run(engine._build_user_profiles, snapshot, missing, preferences, interactions))
+            return profiles
+
+    async def _recent_interactions(self, query: Dict, pipeline: Optional[List[Dict]]) -> List[Dict]:
+        """Newest recent interactions per user, as the engine's _get_user_profiles reads them"""
+        if pipeline is None:
+            cursor = self.db.userinteractions.find(query, PROFILE_INTERACTION_FIELDS).sort('createdAt', -1)
+            return await cursor.limit(PROFILE_INTERACTIONS).to_list(None)
+        cursor = await self.db.userinteractions.aggregate(pipeline)
+        return await cursor.to_list(None)
+
+    async def _rank_and_hydrate(self, snapshot: ModelSnapshot, user_ids: List[str], profiles: Dict,
+                                limit: int, filters: Optional[Dict]) -> Dict[str, List[Dict]]:
+        engine = self.engine
+        ranked = await self.run(engine._rank_users, snapshot, user_ids, profiles, limit, filters)
+        with metrics.stage('hydration'):
+            hotels = await self.get_hotels(
+                snapshot.hotel_ids[rec['row']] for recs in ranked.values() for rec in recs
+            )
+            return engine._hydrate_ranked(snapshot, ranked, hotels, limit, filters)
@@ -0,0 +1,132 @@
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+
+
+class HotelAttributeIndex:
+    """Columnar filterable attributes of the hotel catalogue.
+
+    Cities and types are stored as integer codes, price and rating as float
+    arrays and amenities as bitsets packed into 64-bit words, all aligned with
+    hotel_ids. A request's filters become one boolean mask over the catalogue
+    that scorers apply before their top-N selection.
+    """
+
+    def __init__(self, hotel_ids: List[str], city_codes: np.ndarray, city_vocabulary: Dict[str, int],
+                 type_codes: np.ndarray, type_vocabulary: Dict[str, int], prices: np.ndarray,
+                 ratings: np.ndarray, amenity_bits: np.ndarray, amenity_vocabulary: Dict[str, int]):
+        self.hotel_ids = hotel_ids
+        self.hotel_index = {hotel_id: i for i, hotel_id in enumerate(hotel_ids)}
+        self.city_codes = city_codes
+        self.city_vocabulary = city_vocabulary
+        self.type_codes = type_codes
+        self.type_vocabulary = type_vocabulary
+        self.prices = prices
+        self.ratings = ratings
+        self.amenity_bits = amenity_bits
+        self.amenity_vocabulary = amenity_vocabulary
+        self._alignments = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, hotels: List[Dict]) -> 'HotelAttributeIndex':
+        """Index the attributes of hotel documents, in order"""
+        city_vocabulary = {}
+        type_vocabulary = {}
+        amenity_vocabulary = {}
+
+        city_codes = np.array(
+            [city_vocabulary.setdefault((hotel.get('city') or '').lower(), len(city_vocabulary)) for hotel in hotels],
+            dtype=np.int32
+        )
+        type_codes = np.array(
+            [type_vocabulary.setdefault((hotel.get('type') or '').lower(), len(type_vocabulary)) for hotel in hotels],
+            dtype=np.int32
+        )
+        prices = np.array([hotel.get('cheapestPrice') or 0 for hotel in hotels], dtype=float)
+        ratings = np.array([hotel.get('rating') or 0 for hotel in hotels], dtype=float)
+
+        amenity_rows = []
+        for hotel in hotels:
+            amenity_rows.append([amenity_vocabulary.setdefault(amenity, len(amenity_vocabulary))
+                                 for amenity in hotel.get('amenities') or []])
+
+        amenity_bits = np.zeros((len(hotels), max(1, (len(amenity_vocabulary) + 63) // 64)), dtype=np.uint64)
+        for row, bits in enumerate(amenity_rows):
+            for bit in bits:
+                amenity_bits[row, bit // 64] |= np.uint64(1 << (bit % 64))
+
+        return cls([str(hotel['_id']) for hotel in hotels], city_codes, city_vocabulary, type_codes,
+                   type_vocabulary, prices, ratings, amenity_bits, amenity_vocabulary)
+
+    def save(self, writer: ArtifactWriter):
+        """Add the attribute arrays to a model artifact"""
+        for name in ('city_codes', 'type_codes', 'prices', 'ratings', 'amenity_bits'):
+            writer.add_array(name, getattr(self, name))
+        writer.meta['attribute_vocabularies'] = {
+            'city': self.city_vocabulary,
+            'type': self.type_vocabulary,
+            'amenity': self.amenity_vocabulary
+        }
+
+    @classmethod
+    def load(cls, reader: ArtifactReader, hotel_ids: List[str]) -> 'HotelAttributeIndex':
+        """Attribute index saved in a model artifact, with its arrays memory-mapped"""
+        vocabularies = reader.meta['attribute_vocabularies']
+        return cls(hotel_ids, reader.array('city_codes'), vocabularies['city'], reader.array('type_codes'),
+                   vocabularies['type'], reader.array('prices'), reader.array('ratings'),
+                   reader.array('amenity_bits'), vocabularies['amenity'])
+
+    def mask(self, filters: Dict) -> np.ndarray:
+        """Boolean mask over hotel_ids of the hotels that pass the filters"""
+        mask = np.ones(len(self.hotel_ids), dtype=bool)
+
+        if filters.get('city'):
+            mask &= self.city_codes == self.city_vocabulary.get(filters['city'].lower(), -1)
+
+        price_range = filters.get('priceRange') or {}
+        if price_range.get('min') is not None:
+            mask &= self.prices >= price_range['min']
+        if price_range.get('max') is not None:
+            mask &= self.prices <= price_range['max']
+
+        if filters.get('minRating') is not None:
+            mask &= self.ratings >= filters['minRating']
+
+        if filters.get('type'):
+            mask &= self.type_codes == self.type_vocabulary.get(filters['type'].lower(), -1)
+
+        if filters.get('amenities'):
+            required = np.zeros(self.amenity_bits.shape[1], dtype=np.uint64)
+            for amenity in filters['amenities']:
+                bit = self.amenity_vocabulary.get(amenity)
+                if bit is None:
+                    # No indexed hotel has this amenity
+                    return np.zeros(len(self.hotel_ids), dtype=bool)
+                required[bit // 64] |= np.uint64(1 << (bit % 64))
+            mask &= np.all((self.amenity_bits & required) == required, axis=1)
+
+        return mask
+
+    def align(self, mask: np.ndarray, hotel_ids: List[str]) -> np.ndarray:
+        """Re-order a mask to another model's hotel id list; hotels not in the index stay eligible"""
+        if hotel_ids is self.hotel_ids:
+            return mask
+
+        rows = self._rows_for(hotel_ids)
+        return np.where(rows >= 0, mask[rows], True)
+
+    def _rows_for(self, hotel_ids: List[str]) -> np.ndarray:
+        # Models keep their id lists for their lifetime, so remember the last few alignments
+        with self._lock:
+            for ids, rows in self._alignments:
+                if ids is hotel_ids:
+                    return rows
+
+        rows = np.array([self.hotel_index.get(str(hotel_id), -1) for hotel_id in hotel_ids], dtype=np.intp)
+        with self._lock:
+            self._alignments = [(hotel_ids, rows)] + self._alignments[:7]
+        return rows
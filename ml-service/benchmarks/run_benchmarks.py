@@ -0,0 +1,304 @@
+"""Benchmark the recommendation engine's hot paths on synthetic data.
+
+Loads a deterministic dataset into an in-process mongomock database, times
+model training and each serving call separately, and prints one JSON
+document with latency percentiles, each benchmark's peak RSS growth and
+Mongo operation counts so that runs can be diffed across commits.
+
+Usage, from ml-service/:
+    python benchmarks/run_benchmarks.py --scale small --output results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List
+from unittest import mock
+
+import numpy as np
+import mongomock
+import mongomock.collection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import SCALES, DatasetSpec, SyntheticDataset  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Collection methods that issue a query or write against the database
+COUNTED_OPERATIONS = [
+    'find', 'find_one', 'aggregate', 'count_documents', 'estimated_document_count', 'distinct',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one', 'delete_one',
+    'delete_many', 'bulk_write', 'create_index'
+]
+
+
+class MongoOperationCounter:
+    """Counts and times collection-level operations on mongomock collections.
+
+    Only the outermost operation is counted, so a find_one that mongomock
+    implements with find counts once. Cursor iteration is included in the
+    Mongo time, since mongomock filters and copies documents lazily there.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.seconds = 0.0
+        self._local = threading.local()
+
+    @contextmanager
+    def installed(self):
+        patched = [(mongomock.collection.Collection, name, True) for name in COUNTED_OPERATIONS]
+        patched.append((mongomock.collection.Cursor, '__next__', False))
+        originals = [(cls, name, getattr(cls, name)) for cls, name, _ in patched]
+
+        for (cls, name, counted), (_, _, method) in zip(patched, originals):
+            setattr(cls, name, self._instrument(name, method, counted))
+        try:
+            yield self
+        finally:
+            for cls, name, method in originals:
+                setattr(cls, name, method)
+
+    def _instrument(self, name: str, method: Callable, counted: bool) -> Callable:
+        def wrapper(target, *args, **kwargs):
+            if getattr(self._local, 'active', False):
+                return method(target, *args, **kwargs)
+
+            self._local.active = True
+            started = time.perf_counter()
+            try:
+                return method(target, *args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - started
+                self._local.active = False
+                if counted:
+                    key = f'{target.name}.{name}'
+                    self.counts[key] = self.counts.get(key, 0) + 1
+        return wrapper
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+    def since(self, before: Dict[str, int]) -> Dict[str, int]:
+        return {key: count - before.get(key, 0) for key, count in self.counts.items() if count != before.get(key, 0)}
+
+
+def _proc_status_mb(field: str) -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _lifetime_peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+@contextmanager
+def rss_tracked(result: Dict):
+    """Record the resident set size at the start of the block and its peak growth within it.
+
+    On Linux the kernel's high-water mark is reset first, so the peak is this
+    block's own. Elsewhere only the growth of the process-lifetime peak is
+    seen, which misses blocks that stay below an earlier peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        start, peak = _proc_status_mb('VmRSS'), lambda: _proc_status_mb('VmHWM')
+    except OSError:
+        start, peak = _lifetime_peak_mb(), _lifetime_peak_mb
+
+    yield
+    result['rss_mb'] = round(start, 1)
+    result['peak_rss_delta_mb'] = round(max(peak() - start, 0.0), 1)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    milliseconds = np.array(samples) * 1000
+    return {
+        'p50': round(float(np.percentile(milliseconds, 50)), 3),
+        'p90': round(float(np.percentile(milliseconds, 90)), 3),
+        'p99': round(float(np.percentile(milliseconds, 99)), 3),
+        'max': round(float(milliseconds.max()), 3),
+        'mean': round(float(milliseconds.mean()), 3)
+    }
+
+
+def measure(counter: MongoOperationCounter, calls: List[Callable[[], object]],
+            before_each: Callable[[], None] = None) -> Dict:
+    """Time each call separately and summarize latencies, Mongo operations and peak RSS growth"""
+    samples = []
+    mongo_samples = []
+    memory = {}
+    operations = counter.snapshot()
+    with rss_tracked(memory):
+        for call in calls:
+            if before_each is not None:
+                before_each()
+            mongo_seconds = counter.seconds
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+            mongo_samples.append(counter.seconds - mongo_seconds)
+
+    mongo_operations = counter.since(operations)
+    return {
+        'calls': len(samples),
+        'latency_ms': latency_summary(samples),
+        # Time inside the Mongo stand-in, whose scans are far slower than an indexed server's
+        'mongo_ms': latency_summary(mongo_samples),
+        'engine_ms': latency_summary([total - mongo for total, mongo in zip(samples, mongo_samples)]),
+        'mongo_operations': sum(mongo_operations.values()),
+        'mongo_operations_per_call': round(sum(mongo_operations.values()) / max(len(samples), 1), 2),
+        'mongo_operations_by_collection': mongo_operations,
+        **memory
+    }
+
+
+def run(spec: DatasetSpec, requests: int, train_repeats: int) -> Dict:
+    client = mongomock.MongoClient('mongodb://localhost:27017/booking-app')
+    db = client.get_default_database()
+
+    dataset = SyntheticDataset(spec)
+    started = time.perf_counter()
+    counts = dataset.load(db)
+    load_seconds = time.perf_counter() - started
+    logger.info(f"Loaded {counts} in {load_seconds:.1f}s")
+
+    counter = MongoOperationCounter()
+    results = {}
+
+    # Start the engine against the in-process database without training at startup
+    os.environ.setdefault('MODEL_STARTUP_MODE', 'lazy')
+    from recommendation_engine import RecommendationEngine
+
+    with counter.installed(), mock.patch('pymongo.MongoClient', return_value=client):
+        operations = counter.snapshot()
+        memory = {}
+        started = time.perf_counter()
+        with rss_tracked(memory):
+            engine = RecommendationEngine()
+            # Popularity counts and the trending window load in the background; include them in startup
+            engine.popularity_table.loaded.wait()
+            engine.trending_counters.loaded.wait()
+        results['engine_startup'] = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'mongo_operations_by_collection': counter.since(operations),
+            **memory
+        }
+
+    try:
+        with counter.installed():
+            results['train_content_based_model'] = measure(
+                counter, [engine._train_content_based_model] * train_repeats
+            )
+            results['train_collaborative_model'] = measure(
+                counter, [engine._train_collaborative_model] * train_repeats
+            )
+            # Serve the last committed artifacts the way a retrain publishes them
+            engine.snapshot = engine.snapshot.replace(
+                collaborative_backend='knn',
+                **engine._load_models(['content', 'collaborative'])
+            )
+
+            rng = random.Random(spec.seed)
+            user_ids = [str(user_id) for user_id in rng.sample(dataset.user_ids, min(requests, spec.users))]
+            hotel_ids = [str(hotel_id) for hotel_id in rng.sample(dataset.hotel_ids, min(requests, spec.hotels))]
+
+            results['get_personalized_recommendations'] = measure(
+                counter, [lambda user_id=user_id: engine.get_personalized_recommendations(user_id, 10) for user_id in user_ids]
+            )
+            results['get_similar_hotels'] = measure(
+                counter, [lambda hotel_id=hotel_id: engine.get_similar_hotels(hotel_id, 5) for hotel_id in hotel_ids]
+            )
+            # Drop the result cache each time so the ranking itself is measured, not a cache hit
+            results['get_trending_hotels'] = measure(
+                counter, [lambda: engine.get_trending_hotels(10)] * requests,
+                before_each=engine.trending_cache.invalidate
+            )
+            results['analyze_user_profile'] = measure(
+                counter, [lambda user_id=user_id: engine.analyze_user_profile(user_id) for user_id in user_ids]
+            )
+    finally:
+        engine.stop()
+
+    return {
+        'started_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'dataset': {
+            **vars(spec),
+            'now': dataset.now.isoformat(),
+            'documents': counts,
+            'load_seconds': round(load_seconds, 3)
+        },
+        'requests': requests,
+        'train_repeats': train_repeats,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recommendation engine hot paths on synthetic data')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--hotels', type=int, help='override the number of hotels of the scale')
+    parser.add_argument('--users', type=int, help='override the number of users of the scale')
+    parser.add_argument('--interactions', type=int, help='override the number of interactions of the scale')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='timed calls per serving benchmark')
+    parser.add_argument('--train-repeats', type=int, default=1, help='timed runs per training benchmark')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    logger.setLevel(logging.INFO)
+
+    scale = SCALES[args.scale]
+    spec = DatasetSpec(
+        hotels=args.hotels or scale['hotels'],
+        users=args.users or scale['users'],
+        interactions=args.interactions or scale['interactions'],
+        seed=args.seed
+    )
+
+    # Models are written under ./models; keep benchmark runs from touching the service's artifacts
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix='rec-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = run(spec, args.requests, args.train_repeats)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report['scale'] = args.scale
+    encoded = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(encoded + '\n')
+    else:
+        print(encoded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Deterministic synthetic booking data for benchmarking the recommendation engine.
+
+Documents follow the backend's Mongoose schemas closely enough for every
+engine code path: hotels with text, amenities and prices, per-user
+preferences, bookings, and view/click/booking interactions whose hotel
+popularity and user activity are both long-tailed, as in real traffic.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import numpy as np
+from bson import ObjectId
+
+CITIES = [
+    'Mumbai', 'Delhi', 'Bangalore', 'Chennai', 'Goa', 'Jaipur', 'Kolkata', 'Hyderabad', 'Pune', 'Udaipur',
+    'Kochi', 'Shimla', 'Manali', 'Agra', 'Varanasi', 'Rishikesh', 'Mysore', 'Darjeeling', 'Ooty', 'Amritsar'
+]
+HOTEL_TYPES = ['hotel', 'apartment', 'resort', 'villa', 'cabin', 'hostel', 'guesthouse']
+AMENITIES = [
+    'wifi', 'parking', 'pool', 'gym', 'spa', 'restaurant', 'bar', 'room_service', 'concierge',
+    'business_center', 'pet_friendly', 'airport_shuttle', 'laundry', 'air_conditioning', 'heating',
+    'balcony', 'kitchen', 'breakfast', 'beach_access'
+]
+TRAVEL_STYLES = ['business', 'leisure', 'family', 'romantic', 'adventure', 'budget', 'luxury']
+DESCRIPTION_WORDS = [
+    'beach', 'mountain', 'lake', 'heritage', 'modern', 'cozy', 'spacious', 'quiet', 'central', 'scenic',
+    'luxury', 'budget', 'family', 'romantic', 'garden', 'rooftop', 'view', 'walk', 'market', 'temple',
+    'river', 'forest', 'downtown', 'airport', 'station', 'sea', 'sunset', 'pool', 'terrace', 'courtyard'
+]
+ATTRACTION_CATEGORIES = ['culture', 'nature', 'shopping', 'nightlife', 'food', 'history']
+INTERACTION_TYPES = ['view', 'click', 'booking']
+INTERACTION_PROBABILITIES = [0.7, 0.22, 0.08]
+
+SCALES = {
+    'small': {'hotels': 1000, 'users': 2000, 'interactions': 50000},
+    'medium': {'hotels': 10000, 'users': 20000, 'interactions': 500000},
+    'large': {'hotels': 100000, 'users': 200000, 'interactions': 5000000}
+}
+
+
+@dataclass
+class DatasetSpec:
+    hotels: int
+    users: int
+    interactions: int
+    seed: int = 42
+    days: int = 90
+    preference_ratio: float = 0.5
+
+
+class SyntheticDataset:
+    """Generates and loads one reproducible dataset.
+
+    Timestamps are relative to now, which defaults to the start of today, so
+    that trending, precompute and profile windows see recent activity; for a
+    fixed now, the same spec always yields the same documents.
+    """
+
+    def __init__(self, spec: DatasetSpec, now: datetime = None):
+        self.spec = spec
+        self.now = now or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.rng = np.random.default_rng(spec.seed)
+        self.hotel_ids = [self._object_id(i, 0x01) for i in range(spec.hotels)]
+        self.user_ids = [self._object_id(i, 0x02) for i in range(spec.users)]
+
+    def _object_id(self, n: int, kind: int) -> ObjectId:
+        # Deterministic ids whose leading timestamp bytes still sort by creation order
+        timestamp = int((self.now - timedelta(days=self.spec.days)).timestamp()) + n
+        return ObjectId(timestamp.to_bytes(4, 'big') + bytes([kind]) + n.to_bytes(7, 'big'))
+
+    def hotels(self) -> List[Dict]:
+        rng = self.rng
+        hotels = []
+        for i, hotel_id in enumerate(self.hotel_ids):
+            city = CITIES[rng.integers(len(CITIES))]
+            hotel_type = HOTEL_TYPES[rng.integers(len(HOTEL_TYPES))]
+            words = rng.choice(DESCRIPTION_WORDS, size=rng.integers(20, 60))
+            created_at = self.now - timedelta(days=float(rng.uniform(30, 365)))
+            hotels.append({
+                '_id': hotel_id,
+                'name': f'{city} {hotel_type.title()} {i}',
+                'type': hotel_type,
+                'city': city,
+                'address': f'{rng.integers(1, 500)} Main Road, {city}',
+                'distance': f'{rng.integers(100, 5000)}m',
+                'title': ' '.join(words[:6]),
+                'desc': ' '.join(words),
+                'amenities': sorted(rng.choice(AMENITIES, size=rng.integers(2, 9), replace=False).tolist()),
+                'nearbyAttractions': [
+                    {'name': f'Attraction {rng.integers(1000)}', 'category': ATTRACTION_CATEGORIES[rng.integers(len(ATTRACTION_CATEGORIES))]}
+                    for _ in range(rng.integers(0, 5))
+                ],
+                'rating': round(float(rng.uniform(1, 5)), 1),
+                'cheapestPrice': int(rng.lognormal(5, 0.6)),
+                'photos': [f'https://images.example.com/{hotel_id}/{n}.jpg' for n in range(rng.integers(3, 12))],
+                'featured': bool(rng.random() < 0.05),
+                'popularityScore': 0,
+                'createdAt': created_at,
+                'updatedAt': created_at
+            })
+        return hotels
+
+    def preferences(self) -> List[Dict]:
+        rng = self.rng
+        preferences = []
+        for user_id in self.user_ids:
+            if rng.random() >= self.spec.preference_ratio:
+                continue
+            low = int(rng.integers(20, 150))
+            preferences.append({
+                'userId': user_id,
+                'preferredCities': [{'city': CITIES[c], 'weight': int(rng.integers(1, 5))}
+                                    for c in rng.choice(len(CITIES), size=rng.integers(1, 4), replace=False)],
+                'preferredHotelTypes': [{'type': HOTEL_TYPES[t], 'weight': int(rng.integers(1, 5))}
+                                        for t in rng.choice(len(HOTEL_TYPES), size=rng.integers(1, 3), replace=False)],
+                'preferredAmenities': [{'amenity': AMENITIES[a], 'importance': int(rng.integers(1, 5))}
+                                       for a in rng.choice(len(AMENITIES), size=rng.integers(1, 5), replace=False)],
+                'priceRange': {'min': low, 'max': low + int(rng.integers(50, 400))},
+                'travelStyle': TRAVEL_STYLES[rng.integers(len(TRAVEL_STYLES))]
+            })
+        return preferences
+
+    def interactions(self, batch_size: int = 50000) -> Iterator[List[Dict]]:
+        """Interactions in batches, with Zipf-like hotel popularity and log-normal user activity"""
+        rng = self.rng
+        spec = self.spec
+        hotel_weights = 1.0 / np.arange(1, spec.hotels + 1) ** 1.1
+        hotel_weights = rng.permutation(hotel_weights / hotel_weights.sum())
+        user_weights = rng.lognormal(0, 1, spec.users)
+        user_weights /= user_weights.sum()
+
+        for start in range(0, spec.interactions, batch_size):
+            size = min(batch_size, spec.interactions - start)
+            users = rng.choice(spec.users, size=size, p=user_weights)
+            hotels = rng.choice(spec.hotels, size=size, p=hotel_weights)
+            types = rng.choice(len(INTERACTION_TYPES), size=size, p=INTERACTION_PROBABILITIES)
+            ages = rng.uniform(0, spec.days * 86400, size=size)
+            durations = rng.integers(0, 600, size=size)
+
+            batch = []
+            for user, hotel, interaction_type, age, duration in zip(users, hotels, types, ages, durations):
+                created_at = self.now - timedelta(seconds=float(age))
+                batch.append({
+                    'userId': self.user_ids[user],
+                    'hotelId': self.hotel_ids[hotel],
+                    'interactionType': INTERACTION_TYPES[interaction_type],
+                    'sessionId': f's{user}-{int(age) // 3600}',
+                    'duration': int(duration),
+                    'createdAt': created_at,
+                    'updatedAt': created_at
+                })
+            yield batch
+
+    def load(self, db) -> Dict[str, int]:
+        """Insert the dataset into a database and return per-collection document counts"""
+        for name in ('hotels', 'userinteractions', 'userpreferences', 'bookings'):
+            db[name].drop()
+
+        hotels = self.hotels()
+        db.hotels.insert_many(hotels)
+        prices = {hotel['_id']: hotel['cheapestPrice'] for hotel in hotels}
+
+        preferences = self.preferences()
+        if preferences:
+            db.userpreferences.insert_many(preferences)
+
+        bookings = 0
+        for batch in self.interactions():
+            db.userinteractions.insert_many(batch)
+            booked = [
+                {
+                    'userId': interaction['userId'],
+                    'hotelId': interaction['hotelId'],
+                    'totalAmount': prices[interaction['hotelId']] * int(self.rng.integers(1, 6)),
+                    'status': 'completed',
+                    'rating': {'overall': int(self.rng.integers(0, 6))},
+                    'createdAt': interaction['createdAt']
+                }
+                for interaction in batch if interaction['interactionType'] == 'booking'
+            ]
+            if booked:
+                db.bookings.insert_many(booked)
+                bookings += len(booked)
+
+        return {
+            'hotels': len(hotels),
+            'users': self.spec.users,
+            'userpreferences': len(preferences),
+            'userinteractions': self.spec.interactions,
+            'bookings': bookings
+        }
@@ -0,0 +1,114 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+from neighbor_index import create_neighbor_index, load_neighbor_index
+
+logger = logging.getLogger(__name__)
+
+
+class CollaborativeModel:
+    """Trained collaborative filtering state held in memory.
+
+    Bundles the sparse user x hotel interaction matrix with its id index maps,
+    the fitted scaler and the user neighbour index, so a retrain can publish all of them
+    with a single reference swap.
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, user_ids: List[str], hotel_ids: List[str],
+                 scaler: StandardScaler, neighbor_index):
+        self.matrix = matrix.tocsr()
+        self.user_ids = user_ids
+        self.hotel_ids = hotel_ids
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        self.hotel_index = {hotel_id: i for i, hotel_id in enumerate(hotel_ids)}
+        self.scaler = scaler
+        self.neighbor_index = neighbor_index
+
+    @property
+    def n_users(self) -> int:
+        return self.matrix.shape[0]
+
+    @classmethod
+    def fit(cls, matrix: sparse.csr_matrix, user_ids: List[str], hotel_ids: List[str],
+            neighbor_index=None) -> 'CollaborativeModel':
+        """Fit the scaler and neighbour index on an interaction matrix without densifying it"""
+        # Centering would densify the matrix, so only scale each hotel column to unit variance
+        scaler = StandardScaler(with_mean=False)
+        user_features = scaler.fit_transform(matrix)
+
+        if neighbor_index is None:
+            neighbor_index = create_neighbor_index()
+        neighbor_index.fit(user_features)
+
+        return cls(matrix, user_ids, hotel_ids, scaler, neighbor_index)
+
+    def user_row(self, user_id: str) -> Optional[int]:
+        """Row index of a user in the interaction matrix"""
+        return self.user_index.get(str(user_id))
+
+    def nearest_users(self, user_row: int, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the most similar users, excluding the user themselves, with their similarities"""
+        user_vector_scaled = self.scaler.transform(self.matrix[user_row])
+        distances, indices = self.neighbor_index.kneighbors(user_vector_scaled, n_neighbors=n_neighbors + 1)
+
+        keep = indices[0] != user_row
+        neighbor_rows = indices[0][keep][:n_neighbors]
+        similarities = 1 / (1 + distances[0][keep][:n_neighbors])  # Convert distance to similarity
+        return neighbor_rows, similarities
+
+    def score_unseen_hotels(self, user_row: int, neighbor_rows: np.ndarray, similarities: np.ndarray):
+        """Similarity-weighted neighbour average for every hotel the user has not interacted with.
+
+        Each hotel's score is sum(sim * rating) / sum(sim) over the neighbours that
+        rated it. Returns the scored column indices and their scores.
+        """
+        neighbors = self.matrix[neighbor_rows]
+        positive = neighbors.data > 0
+
+        # Expand the CSR rows so every stored rating carries its neighbour's similarity
+        rating_weights = np.repeat(similarities, np.diff(neighbors.indptr))[positive]
+        columns = neighbors.indices[positive]
+        ratings = neighbors.data[positive]
+
+        weighted_scores = np.bincount(columns, weights=rating_weights * ratings, minlength=self.matrix.shape[1])
+        total_weights = np.bincount(columns, weights=rating_weights, minlength=self.matrix.shape[1])
+
+        # Drop hotels the user has already interacted with
+        user_start, user_end = self.matrix.indptr[user_row], self.matrix.indptr[user_row + 1]
+        total_weights[self.matrix.indices[user_start:user_end]] = 0
+
+        candidates = np.flatnonzero(total_weights > 0)
+        return candidates, weighted_scores[candidates] / total_weights[candidates]
+
+    def save(self, model_dir: str = 'models', watermark: Optional[Dict] = None):
+        """Persist the model for warm starts as a memory-mappable artifact"""
+        writer = ArtifactWriter(model_dir, 'collaborative')
+        writer.add_csr('matrix', self.matrix)
+        writer.add_ids('user_ids', self.user_ids)
+        writer.add_ids('hotel_ids', self.hotel_ids)
+        writer.add_object('scaler', self.scaler)
+        self.neighbor_index.save(writer)
+        writer.meta['watermark'] = watermark
+        writer.commit()
+
+    @classmethod
+    def load(cls, model_dir: str = 'models') -> Optional['CollaborativeModel']:
+        """Load the current persisted model with its matrices memory-mapped, or None if there is none"""
+        reader = ArtifactReader.open(model_dir, 'collaborative')
+        return cls.from_reader(reader) if reader is not None else None
+
+    @classmethod
+    def from_reader(cls, reader: ArtifactReader) -> 'CollaborativeModel':
+        """Model from an opened artifact, with its matrices memory-mapped"""
+        return cls(
+            reader.csr('matrix'),
+            reader.ids('user_ids'),
+            reader.ids('hotel_ids'),
+            reader.object('scaler'),
+            load_neighbor_index(reader)
+        )
@@ -0,0 +1,162 @@
+"""Flight recorder for slow requests.
+
+While it runs, a sampler thread records the stack of every thread that is
+serving a request every few milliseconds. When a request finishes, its
+samples are kept only if it was slower than the threshold, or if the caller
+asked for it to be profiled, together with its inputs and per-stage timings.
+The last captures are held in a bounded ring buffer and can be exported as
+collapsed stacks, the input format of flamegraph.pl and speedscope.
+"""
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Request body fields worth keeping with a capture; lists of users are kept as their length
+PROFILED_INPUTS = ('userId', 'hotelId', 'limit', 'filters', 'fields', 'model_type')
+
+
+def profiled_inputs(args: Dict, body) -> Dict:
+    """The parts of a request's query string and JSON body that explain its cost"""
+    inputs = dict(args)
+    if isinstance(body, dict):
+        inputs.update((key, body[key]) for key in PROFILED_INPUTS if key in body)
+        if isinstance(body.get('userIds'), list):
+            inputs['userIds'] = len(body['userIds'])
+    return inputs
+
+
+class RequestProfile:
+    """Samples and context of one request in flight"""
+
+    __slots__ = ('thread_id', 'inputs', 'forced', 'started', 'started_at', 'stacks', 'stages')
+
+    def __init__(self, inputs: Dict, forced: bool):
+        self.thread_id = threading.get_ident()
+        self.inputs = inputs
+        self.forced = forced
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.stacks = Counter()
+        self.stages = metrics.record_stages()
+
+
+class FlightRecorder:
+    """Samples request threads and keeps the profiles of the slowest requests"""
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 500, interval_ms: float = 5,
+                 capacity: int = 50):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self._active = {}
+        self._captures = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='flight-recorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def begin(self, inputs: Dict, forced: bool = False) -> Optional[RequestProfile]:
+        """Start sampling the current thread's request"""
+        if not self.enabled:
+            return None
+        profile = RequestProfile(inputs, forced)
+        with self._lock:
+            self._active[profile.thread_id] = profile
+        return profile
+
+    def finish(self, profile: Optional[RequestProfile], endpoint: Optional[str], method: str, path: str,
+               status: int):
+        """Stop sampling a request and keep its capture if it was slow or forced"""
+        if profile is None:
+            return
+        duration_ms = (time.perf_counter() - profile.started) * 1000
+        with self._lock:
+            if self._active.get(profile.thread_id) is profile:
+                del self._active[profile.thread_id]
+        metrics.stop_recording_stages()
+
+        if duration_ms < self.threshold_ms and not profile.forced:
+            return
+
+        capture = {
+            'id': uuid.uuid4().hex[:12],
+            'endpoint': endpoint or 'unknown',
+            'method': method,
+            'path': path,
+            'status': status,
+            'started_at': profile.started_at.isoformat(),
+            'duration_ms': round(duration_ms, 3),
+            'forced': profile.forced,
+            'inputs': profile.inputs,
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in profile.stages.items()},
+            'samples': sum(profile.stacks.values()),
+            'stacks': dict(profile.stacks)
+        }
+        with self._lock:
+            self._captures.append(capture)
+        logger.info(f"Captured profile {capture['id']} of {capture['endpoint']} ({capture['duration_ms']:.0f} ms)")
+
+    def captures(self, capture_id: str = None) -> List[Dict]:
+        """Captures, newest first, or only the one with capture_id"""
+        with self._lock:
+            captures = list(reversed(self._captures))
+        if capture_id is not None:
+            captures = [capture for capture in captures if capture['id'] == capture_id]
+        return captures
+
+    def collapsed(self, captures: List[Dict]) -> str:
+        """Collapsed stacks of captures, each rooted at a frame naming its request"""
+        lines = []
+        for capture in captures:
+            root = f"{capture['endpoint']} {capture['id']} ({capture['duration_ms']:.0f}ms)"
+            for stack, count in capture['stacks'].items():
+                lines.append(f'{root};{stack} {count}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logger.error(f"Error sampling request stacks: {str(e)}")
+
+    def _sample(self):
+        with self._lock:
+            if not self._active:
+                return
+            frames = sys._current_frames()
+            for thread_id, profile in self._active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
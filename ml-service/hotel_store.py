@@ -0,0 +1,92 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Fields that list views and request-time filtering read from a hotel document
+DEFAULT_HOTEL_FIELDS = 'name,type,city,title,cheapestPrice,rating,amenities,photos'
+
+
+def hotel_projection(fields: str = DEFAULT_HOTEL_FIELDS, photo_limit: int = 1) -> Optional[Dict]:
+    """Mongo projection for comma-separated hotel fields, or None for whole documents if fields is '*'"""
+    if fields.strip() == '*':
+        return None
+
+    projection = {field.strip(): 1 for field in fields.split(',') if field.strip()}
+    if 'photos' in projection and photo_limit > 0:
+        projection['photos'] = {'$slice': photo_limit}
+    return projection
+
+
+class HotelStore:
+    """Bounded LRU/TTL cache of projected hotel documents backed by bulk $in lookups"""
+
+    def __init__(self, collection, max_size: int = 5000, ttl_seconds: float = 300,
+                 projection: Optional[Dict] = None):
+        self.collection = collection
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.projection = projection
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, hotel_ids: Iterable) -> Dict[str, Dict]:
+        """Get hotel documents keyed by string id, fetching all cache misses in one query"""
+        found, missing = self._lookup(hotel_ids)
+
+        if missing:
+            self._remember(self.collection.find({'_id': {'$in': missing}}, self.projection), found)
+
+        return found
+
+    async def get_many_async(self, collection, hotel_ids: Iterable) -> Dict[str, Dict]:
+        """get_many through an async driver collection, sharing this store's cache"""
+        found, missing = self._lookup(hotel_ids)
+
+        if missing:
+            self._remember(await collection.find({'_id': {'$in': missing}}, self.projection).to_list(None), found)
+
+        return found
+
+    def _lookup(self, hotel_ids: Iterable) -> Tuple[Dict[str, Dict], List[ObjectId]]:
+        """Cached hotels keyed by string id, and the ObjectIds of the misses"""
+        keys = list(dict.fromkeys(str(hotel_id) for hotel_id in hotel_ids))
+        found = {}
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            for key in keys:
+                entry = self._cache.get(key)
+                if entry and now - entry[0] < self.ttl_seconds:
+                    self._cache.move_to_end(key)
+                    found[key] = entry[1]
+                elif ObjectId.is_valid(key):
+                    missing.append(ObjectId(key))
+
+        return found, missing
+
+    def _remember(self, hotels: Iterable[Dict], found: Dict[str, Dict]):
+        now = time.monotonic()
+        with self._lock:
+            for hotel in hotels:
+                key = str(hotel['_id'])
+                found[key] = hotel
+                self._cache[key] = (now, hotel)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, hotel_ids: Optional[Iterable] = None):
+        """Drop the given hotels from the cache, or everything if no ids are given"""
+        with self._lock:
+            if hotel_ids is None:
+                self._cache.clear()
+            else:
+                for hotel_id in hotel_ids:
+                    self._cache.pop(str(hotel_id), None)
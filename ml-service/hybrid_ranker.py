@@ -0,0 +1,56 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import ranking
+
+
+class HybridRanker:
+    """Weighted blend of content, collaborative and popularity scores over the whole catalogue.
+
+    Every input is an array aligned with the snapshot's hotel ids, with NaN
+    where a source did not score a hotel. The blend is one vectorized
+    expression, so a hotel strong in only one source is never cut off by the
+    other's truncation, and reasons are derived only for the top N.
+    """
+
+    def __init__(self, content_weight: float = 0.6, collab_weight: float = 0.4,
+                 popularity_weight: float = 0.1, trending_threshold: float = 0.5):
+        self.content_weight = content_weight
+        self.collab_weight = collab_weight
+        self.popularity_weight = popularity_weight
+        self.trending_threshold = trending_threshold
+
+    def rank(self, content: np.ndarray, collab: np.ndarray, popularity: np.ndarray, limit: int,
+             mask: Optional[np.ndarray] = None, content_reason: str = 'content_similarity',
+             collab_reason: str = 'collaborative_filtering') -> List[Dict]:
+        """Top hotel rows by blended score, with their score breakdown and reasons"""
+        content_part = self.content_weight * np.nan_to_num(content)
+        collab_part = self.collab_weight * np.nan_to_num(collab)
+        total = content_part + collab_part + self.popularity_weight * popularity
+
+        if mask is not None:
+            total = np.where(mask, total, -np.inf)
+
+        top = ranking.top_n_indices(total, limit)
+        top = top[np.isfinite(total[top])]
+
+        results = []
+        for row in top:
+            reasons = []
+            if content[row] > 0:
+                reasons.append(content_reason)
+            if collab[row] > 0 and collab_reason not in reasons:
+                reasons.append(collab_reason)
+            if popularity[row] > self.trending_threshold:
+                reasons.append('trending')
+
+            results.append({
+                'row': int(row),
+                'score': float(total[row]),
+                'content_score': float(content_part[row]),
+                'collab_score': float(collab_part[row]),
+                'reasons': reasons
+            })
+
+        return results
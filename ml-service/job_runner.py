@@ -0,0 +1,87 @@
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """Runs long jobs such as model retraining one at a time on a background worker thread.
+
+    Jobs are tracked in a bounded history so their status can be polled after
+    the request that started them has returned.
+    """
+
+    def __init__(self, max_history: int = 50):
+        self.max_history = max_history
+        self._jobs = OrderedDict()
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jobs')
+
+    def submit(self, job_type: str, task: Callable[..., Dict], **params) -> Dict:
+        """Queue task(**params), reusing an identical job that has not started yet"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job['status'] == 'queued' and job['job_type'] == job_type and job['params'] == params:
+                    return dict(job)
+
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'job_type': job_type,
+                'params': params,
+                'status': 'queued',
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'model_version': None
+            }
+            self._jobs[job['job_id']] = job
+            self._tasks[job['job_id']] = task
+
+            # Forget the oldest finished jobs; queued and running ones are always kept
+            finished = [job_id for job_id, old in self._jobs.items() if old['status'] in ('succeeded', 'failed')]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_history)]:
+                del self._jobs[job_id]
+
+        self._executor.submit(self._run, job['job_id'])
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current status of a job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> List[Dict]:
+        """Status of recent jobs, newest first"""
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+            task = self._tasks.pop(job_id)
+            params = job['params']
+
+        try:
+            result = task(**params)
+            status = 'failed' if 'error' in result else 'succeeded'
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            result, status = {'error': str(e)}, 'failed'
+
+        with self._lock:
+            job['status'] = status
+            job['finished_at'] = datetime.now().isoformat()
+            job['result'] = result
+            job['model_version'] = result.get('model_version')
@@ -0,0 +1,109 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+
+logger = logging.getLogger(__name__)
+
+
+class MatrixFactorizationModel:
+    """Implicit-feedback matrix factorization collaborative filtering model.
+
+    Factorizes the weighted user x hotel interaction matrix with alternating
+    least squares (Hu, Koren & Volinsky 2008): every interaction is a positive
+    preference with confidence 1 + alpha * weight. Serving a user is a single
+    dot product of their factor vector with the item-factor matrix.
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, user_ids: List[str], hotel_ids: List[str],
+                 user_factors: np.ndarray, item_factors: np.ndarray):
+        self.matrix = matrix.tocsr()
+        self.user_ids = user_ids
+        self.hotel_ids = hotel_ids
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+
+    @classmethod
+    def fit(cls, matrix: sparse.csr_matrix, user_ids: List[str], hotel_ids: List[str],
+            factors: int = 32, regularization: float = 0.1, alpha: float = 10.0,
+            iterations: int = 10, random_state: int = 42) -> 'MatrixFactorizationModel':
+        """Train user and item factors with implicit ALS"""
+        matrix = matrix.tocsr().astype(np.float32)
+        confidence = matrix * alpha
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(random_state)
+        user_factors = (rng.standard_normal((matrix.shape[0], factors)) * 0.01).astype(np.float32)
+        item_factors = (rng.standard_normal((matrix.shape[1], factors)) * 0.01).astype(np.float32)
+
+        for _ in range(iterations):
+            cls._least_squares(confidence, user_factors, item_factors, regularization)
+            cls._least_squares(confidence_t, item_factors, user_factors, regularization)
+
+        return cls(matrix, user_ids, hotel_ids, user_factors, item_factors)
+
+    @staticmethod
+    def _least_squares(confidence: sparse.csr_matrix, x: np.ndarray, y: np.ndarray, regularization: float):
+        """Solve every row of x given fixed y, in place"""
+        n_factors = y.shape[1]
+        yty = y.T.dot(y) + regularization * np.eye(n_factors, dtype=y.dtype)
+
+        for row in range(x.shape[0]):
+            start, end = confidence.indptr[row], confidence.indptr[row + 1]
+            if start == end:
+                x[row] = 0
+                continue
+
+            cols = confidence.indices[start:end]
+            extra_confidence = confidence.data[start:end]
+            y_row = y[cols]
+
+            # (YtY + Yt(Cu - I)Y + lambda*I) x_u = Yt Cu p_u, with p_u = 1 on observed hotels
+            a = yty + (y_row.T * extra_confidence).dot(y_row)
+            b = y_row.T.dot(extra_confidence + 1)
+            x[row] = np.linalg.solve(a, b)
+
+    def user_row(self, user_id: str) -> Optional[int]:
+        """Row index of a user in the interaction matrix"""
+        return self.user_index.get(str(user_id))
+
+    def score_unseen_hotels(self, user_row: int) -> np.ndarray:
+        """Predicted preference for every hotel column, -inf for hotels the user has interacted with"""
+        scores = self.item_factors.dot(self.user_factors[user_row])
+
+        # Drop hotels the user has already interacted with
+        start, end = self.matrix.indptr[user_row], self.matrix.indptr[user_row + 1]
+        scores[self.matrix.indices[start:end]] = -np.inf
+        return scores
+
+    def save(self, model_dir: str = 'models', watermark: Optional[Dict] = None):
+        """Persist the factor matrices and id maps as a memory-mappable artifact"""
+        writer = ArtifactWriter(model_dir, 'mf')
+        writer.add_array('user_factors', self.user_factors)
+        writer.add_array('item_factors', self.item_factors)
+        writer.add_csr('matrix', self.matrix)
+        writer.add_ids('user_ids', self.user_ids)
+        writer.add_ids('hotel_ids', self.hotel_ids)
+        writer.meta['watermark'] = watermark
+        writer.commit()
+
+    @classmethod
+    def load(cls, model_dir: str = 'models') -> Optional['MatrixFactorizationModel']:
+        """Load the current persisted model with its arrays memory-mapped, or None if there is none"""
+        reader = ArtifactReader.open(model_dir, 'mf')
+        return cls.from_reader(reader) if reader is not None else None
+
+    @classmethod
+    def from_reader(cls, reader: ArtifactReader) -> 'MatrixFactorizationModel':
+        """Model from an opened artifact, with its arrays memory-mapped"""
+        return cls(
+            reader.csr('matrix'),
+            reader.ids('user_ids'),
+            reader.ids('hotel_ids'),
+            reader.array('user_factors'),
+            reader.array('item_factors')
+        )
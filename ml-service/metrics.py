@@ -0,0 +1,259 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TRAINING_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100)
+SIZE_BUCKETS = (0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last is +Inf), sum and count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        for key, (bucket_counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'))
+
+STAGE_SECONDS = registry.histogram(
+    'recommendation_stage_seconds', 'Wall time of each recommendation pipeline stage', ['stage']
+)
+CANDIDATES = registry.histogram(
+    'recommendation_candidates', 'Candidate hotels per scored user by source', ['source'], SIZE_BUCKETS
+)
+TRAINING_SECONDS = registry.histogram(
+    'model_training_seconds', 'Wall time of each model training run', ['model'], TRAINING_BUCKETS
+)
+MONGO_OPERATIONS = registry.counter(
+    'mongo_operations_total', 'Mongo commands sent to the server', ['command']
+)
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Wall time of each HTTP request', ['endpoint']
+)
+REQUEST_MONGO_OPERATIONS = registry.histogram(
+    'http_request_mongo_operations', 'Mongo commands sent while handling each HTTP request', ['endpoint'], COUNT_BUCKETS
+)
+
+# Mongo command count of the request being handled in the current thread or task
+_request_operations = contextvars.ContextVar('request_operations', default=None)
+# Per-stage wall times of the request being profiled in the current thread or task
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class _StageTimer:
+    __slots__ = ('name', 'stages', 'started')
+
+    def __init__(self, name: str, stages: Optional[Dict[str, float]]):
+        self.name = name
+        self.stages = stages
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        if registry.enabled:
+            STAGE_SECONDS.observe(elapsed, stage=self.name)
+        if self.stages is not None:
+            self.stages[self.name] = self.stages.get(self.name, 0.0) + elapsed
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(histogram: Histogram, **labels):
+    """Context manager observing its block's wall time, or doing nothing if metrics are disabled"""
+    if not registry.enabled:
+        return _NOOP_TIMER
+    return _Timer(histogram, labels)
+
+
+def stage(name: str):
+    """Time one recommendation pipeline stage, for the histogram and any request being profiled"""
+    stages = _request_stages.get()
+    if stages is None and not registry.enabled:
+        return _NOOP_TIMER
+    return _StageTimer(name, stages)
+
+
+def record_stages() -> Dict[str, float]:
+    """Accumulate stage wall times of the current context into the returned dict"""
+    stages = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def stop_recording_stages():
+    _request_stages.set(None)
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands globally and for the request in progress"""
+
+    def started(self, event):
+        MONGO_OPERATIONS.inc(command=event.command_name)
+        operations = _request_operations.get()
+        if operations is not None:
+            operations[0] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def event_listeners() -> List[monitoring.CommandListener]:
+    """Listeners to pass to a Mongo client; none when metrics are disabled"""
+    return [MongoCommandCounter()] if registry.enabled else []
+
+
+def begin_request() -> Optional[Tuple[float, List[int]]]:
+    """Start tracking a request in the current context"""
+    if not registry.enabled:
+        return None
+    operations = [0]
+    _request_operations.set(operations)
+    return time.perf_counter(), operations
+
+
+def end_request(state: Optional[Tuple[float, List[int]]], endpoint: Optional[str]):
+    """Record a tracked request's duration and Mongo command count; call once its body has been sent"""
+    if state is None:
+        return
+    started, operations = state
+    endpoint = endpoint or 'unknown'
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    REQUEST_MONGO_OPERATIONS.observe(operations[0], endpoint=endpoint)
+    _request_operations.set(None)
@@ -0,0 +1,167 @@
+import os
+import json
+import uuid
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.lock'
+
+
+@contextmanager
+def artifact_lock(model_dir: str, name: str):
+    """Hold an exclusive lock on an artifact shared by every process using model_dir.
+
+    Held while a model is trained and committed, so workers that find the same
+    model stale train it one at a time and never prune each other's versions.
+    """
+    root = os.path.join(model_dir, name)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ArtifactWriter:
+    """Writes one versioned model artifact directory of raw .npy files and a manifest.
+
+    Arrays and CSR matrix components are stored as plain .npy files so that
+    readers can memory-map them; only small fitted objects such as a
+    vectorizer are pickled. Each save goes to a new version directory and is
+    published by atomically rewriting the CURRENT pointer, so files a running
+    worker has mapped are never modified. Commit while holding artifact_lock.
+    """
+
+    def __init__(self, model_dir: str, name: str, keep_versions: int = 2):
+        self.root = os.path.join(model_dir, name)
+        self.keep_versions = keep_versions
+        self.version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+        self.path = os.path.join(self.root, self.version)
+        self.entries = {}
+        self.meta = {}
+        os.makedirs(self.path)
+
+    def add_array(self, name: str, array: np.ndarray):
+        np.save(os.path.join(self.path, f'{name}.npy'), np.ascontiguousarray(array))
+        self.entries[name] = {'type': 'array', 'file': f'{name}.npy'}
+
+    def add_csr(self, name: str, matrix):
+        matrix = sparse.csr_matrix(matrix)
+        files = {}
+        for part in ('data', 'indices', 'indptr'):
+            files[part] = f'{name}.{part}.npy'
+            np.save(os.path.join(self.path, files[part]), getattr(matrix, part))
+        self.entries[name] = {'type': 'csr', 'shape': list(matrix.shape), 'files': files}
+
+    def add_ids(self, name: str, ids: List[str]):
+        np.save(os.path.join(self.path, f'{name}.npy'), np.array([str(item) for item in ids], dtype=str))
+        self.entries[name] = {'type': 'ids', 'file': f'{name}.npy'}
+
+    def add_object(self, name: str, obj: Any):
+        joblib.dump(obj, os.path.join(self.path, f'{name}.pkl'))
+        self.entries[name] = {'type': 'object', 'file': f'{name}.pkl'}
+
+    def commit(self):
+        """Write the manifest and point CURRENT at this version"""
+        with open(os.path.join(self.path, MANIFEST_FILE), 'w') as f:
+            json.dump({
+                'version': self.version,
+                'created_at': datetime.now().isoformat(),
+                'entries': self.entries,
+                'meta': self.meta
+            }, f, indent=2)
+
+        pointer = os.path.join(self.root, f'{CURRENT_FILE}.{self.version}')
+        with open(pointer, 'w') as f:
+            f.write(self.version)
+        os.replace(pointer, os.path.join(self.root, CURRENT_FILE))
+
+        self._prune()
+
+    def _prune(self):
+        """Remove committed versions older than CURRENT beyond the newest keep_versions"""
+        # A directory without a manifest may still be being written, so only committed versions go.
+        # Workers that still map a removed version keep reading it until they reload
+        current = ArtifactReader.current_version(os.path.dirname(self.root), os.path.basename(self.root))
+        if current is None:
+            return
+        older = sorted(
+            entry for entry in os.listdir(self.root)
+            if entry < current and os.path.isfile(os.path.join(self.root, entry, MANIFEST_FILE))
+        )
+        for version in older[:max(len(older) - (self.keep_versions - 1), 0)]:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+
+class ArtifactReader:
+    """Reads the current version of a model artifact directory, memory-mapping its arrays"""
+
+    def __init__(self, path: str, manifest: Dict, mmap_mode: Optional[str] = 'r'):
+        self.path = path
+        self.manifest = manifest
+        self.mmap_mode = mmap_mode
+
+    @staticmethod
+    def current_version(model_dir: str, name: str) -> Optional[str]:
+        """Version CURRENT points to, or None if the artifact has never been committed"""
+        try:
+            with open(os.path.join(model_dir, name, CURRENT_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def open(cls, model_dir: str, name: str, mmap_mode: Optional[str] = 'r') -> Optional['ArtifactReader']:
+        """Reader for the current version, or None if the artifact has never been written"""
+        root = os.path.join(model_dir, name)
+        try:
+            with open(os.path.join(root, CURRENT_FILE)) as f:
+                path = os.path.join(root, f.read().strip())
+            with open(os.path.join(path, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        return cls(path, manifest, mmap_mode)
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def meta(self) -> Dict:
+        return self.manifest.get('meta', {})
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.manifest['entries']
+
+    def array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, self.manifest['entries'][name]['file']), mmap_mode=self.mmap_mode)
+
+    def csr(self, name: str) -> sparse.csr_matrix:
+        entry = self.manifest['entries'][name]
+        data, indices, indptr = (
+            np.load(os.path.join(self.path, entry['files'][part]), mmap_mode=self.mmap_mode)
+            for part in ('data', 'indices', 'indptr')
+        )
+        return sparse.csr_matrix((data, indices, indptr), shape=tuple(entry['shape']), copy=False)
+
+    def ids(self, name: str) -> List[str]:
+        return np.load(os.path.join(self.path, self.manifest['entries'][name]['file'])).tolist()
+
+    def object(self, name: str) -> Any:
+        return joblib.load(os.path.join(self.path, self.manifest['entries'][name]['file']))
@@ -0,0 +1,62 @@
+import dataclasses
+from dataclasses import dataclass, field
+from functools import cached_property
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from attribute_index import HotelAttributeIndex
+from collaborative_model import CollaborativeModel
+from matrix_factorization import MatrixFactorizationModel
+from similarity_index import SimilarHotelIndex
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """Immutable set of trained models that serve requests together.
+
+    Retraining builds a complete new snapshot and publishes it with a single
+    reference swap, so a request that reads engine.snapshot once never sees a
+    vectorizer from one training run with hotel ids from another.
+    """
+    created_at: datetime = field(default_factory=datetime.now)
+    tfidf_vectorizer: Any = None
+    hotel_features_matrix: Any = None
+    hotel_ids: List[str] = field(default_factory=list)
+    hotel_index: Dict[str, int] = field(default_factory=dict)
+    similar_hotel_index: Optional[SimilarHotelIndex] = None
+    attribute_index: Optional[HotelAttributeIndex] = None
+    collaborative_model: Optional[CollaborativeModel] = None
+    mf_model: Optional[MatrixFactorizationModel] = None
+    collaborative_backend: str = 'knn'
+    # Persisted artifact version each model was loaded from, by artifact name
+    artifact_versions: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def version(self) -> str:
+        """Id of the served models, the same in every worker that loaded the same artifacts"""
+        collaborative_type = 'mf' if self.collaborative_backend == 'mf' else 'collaborative'
+        versions = [self.artifact_versions.get(name) for name in ('content', collaborative_type)]
+        return '+'.join(version for version in versions if version) or 'untrained'
+
+    @property
+    def has_content_model(self) -> bool:
+        return self.hotel_features_matrix is not None and len(self.hotel_ids) > 0
+
+    @property
+    def active_collaborative_model(self):
+        """The collaborative model selected by collaborative_backend"""
+        return self.mf_model if self.collaborative_backend == 'mf' else self.collaborative_model
+
+    @cached_property
+    def collaborative_hotel_rows(self) -> np.ndarray:
+        """Row in hotel_ids of each active collaborative model column, -1 for hotels not in the catalogue"""
+        model = self.active_collaborative_model
+        if model is None:
+            return np.zeros(0, dtype=np.intp)
+        return np.array([self.hotel_index.get(hotel_id, -1) for hotel_id in model.hotel_ids], dtype=np.intp)
+
+    def replace(self, **changes) -> 'ModelSnapshot':
+        """New snapshot with the given models replaced"""
+        return dataclasses.replace(self, created_at=datetime.now(), **changes)
@@ -0,0 +1,171 @@
+import os
+import logging
+from typing import Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+
+logger = logging.getLogger(__name__)
+
+
+class BruteForceNeighborIndex:
+    """Exact cosine k-NN over the full user feature matrix, kept as a correctness baseline.
+
+    Rows are L2-normalized once at fit time, so a query is one sparse product
+    against a matrix that can be memory-mapped from the saved artifact.
+    """
+
+    def __init__(self):
+        self.features = None
+
+    def fit(self, features):
+        self.features = normalize(sparse.csr_matrix(features))
+        return self
+
+    def kneighbors(self, vector, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine distances and row indices of the nearest users, shaped like NearestNeighbors"""
+        query = normalize(sparse.csr_matrix(vector))
+        distances = np.clip(1 - self.features.dot(query.T).toarray().ravel(), 0, 2)
+
+        n_neighbors = min(n_neighbors, len(distances))
+        top = np.argpartition(distances, n_neighbors - 1)[:n_neighbors]
+        top = top[np.argsort(distances[top], kind='stable')]
+
+        return distances[top][np.newaxis, :], top[np.newaxis, :]
+
+    def save(self, writer: ArtifactWriter):
+        writer.meta['neighbor_index'] = 'brute'
+        writer.add_csr('user_features', self.features)
+
+    @classmethod
+    def load(cls, reader: ArtifactReader) -> 'BruteForceNeighborIndex':
+        index = cls()
+        index.features = reader.csr('user_features')
+        return index
+
+
+class LSHNeighborIndex:
+    """Approximate cosine k-NN over a low-dimensional user embedding.
+
+    Users are reduced with truncated SVD, then hashed with random-projection LSH
+    into n_tables tables of n_bits-bit signatures. A query only scores the users
+    that share a bucket with it in at least one table. More tables raise recall;
+    more bits shrink buckets and lower latency.
+    """
+
+    def __init__(self, n_components: int = 64, n_tables: int = 8, n_bits: int = 12,
+                 min_candidates: int = 50, random_state: int = 42):
+        self.n_components = n_components
+        self.n_tables = n_tables
+        self.n_bits = min(n_bits, 62)
+        self.min_candidates = min_candidates
+        self.random_state = random_state
+        self.svd = None
+        self.embeddings = None
+        self.planes = None
+        self.sorted_codes = None
+        self.order = None
+
+    def fit(self, features):
+        n_components = min(self.n_components, features.shape[1] - 1)
+        if n_components >= 1:
+            self.svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+            embeddings = self.svd.fit_transform(features)
+        else:
+            self.svd = None
+            embeddings = features.toarray() if hasattr(features, 'toarray') else np.asarray(features)
+        self.embeddings = normalize(embeddings).astype(np.float32)
+
+        rng = np.random.default_rng(self.random_state)
+        self.planes = rng.standard_normal((self.n_tables, self.embeddings.shape[1], self.n_bits)).astype(np.float32)
+
+        # Sort users by signature in every table so buckets are contiguous ranges
+        codes = self._hash(self.embeddings)
+        self.order = np.argsort(codes, axis=1, kind='stable')
+        self.sorted_codes = np.take_along_axis(codes, self.order, axis=1)
+        return self
+
+    def kneighbors(self, vector, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate cosine distances and row indices of the nearest users"""
+        query = self._embed(vector)
+        query_codes = self._hash(query)[:, 0]
+
+        buckets = []
+        for table, code in enumerate(query_codes):
+            start = np.searchsorted(self.sorted_codes[table], code, side='left')
+            end = np.searchsorted(self.sorted_codes[table], code, side='right')
+            buckets.append(self.order[table, start:end])
+        candidates = np.unique(np.concatenate(buckets))
+
+        # Too few bucket hits to fill the result: scan the whole embedding instead
+        if len(candidates) < max(n_neighbors, self.min_candidates):
+            candidates = np.arange(len(self.embeddings))
+
+        distances = 1 - self.embeddings[candidates].dot(query[0])
+        n_neighbors = min(n_neighbors, len(candidates))
+        top = np.argpartition(distances, n_neighbors - 1)[:n_neighbors]
+        top = top[np.argsort(distances[top], kind='stable')]
+
+        return distances[top][np.newaxis, :], candidates[top][np.newaxis, :]
+
+    def save(self, writer: ArtifactWriter):
+        writer.meta['neighbor_index'] = 'lsh'
+        writer.meta['lsh'] = {
+            'n_components': self.n_components,
+            'n_tables': self.n_tables,
+            'n_bits': self.n_bits,
+            'min_candidates': self.min_candidates,
+            'random_state': self.random_state
+        }
+        if self.svd is not None:
+            writer.add_object('svd', self.svd)
+        for name in ('embeddings', 'planes', 'sorted_codes', 'order'):
+            writer.add_array(name, getattr(self, name))
+
+    @classmethod
+    def load(cls, reader: ArtifactReader) -> 'LSHNeighborIndex':
+        index = cls(**reader.meta['lsh'])
+        index.svd = reader.object('svd') if 'svd' in reader else None
+        for name in ('embeddings', 'planes', 'sorted_codes', 'order'):
+            setattr(index, name, reader.array(name))
+        return index
+
+    def _embed(self, vector) -> np.ndarray:
+        if self.svd is not None:
+            embedded = self.svd.transform(vector)
+        else:
+            embedded = vector.toarray() if hasattr(vector, 'toarray') else np.asarray(vector)
+        return normalize(embedded).astype(np.float32)
+
+    def _hash(self, embeddings: np.ndarray) -> np.ndarray:
+        """LSH signature of each row in each table, shape (n_tables, n_rows)"""
+        bits = np.einsum('nd,tdb->tnb', embeddings, self.planes) > 0
+        return bits.astype(np.int64).dot(1 << np.arange(self.n_bits, dtype=np.int64))
+
+
+def create_neighbor_index():
+    """Create the neighbour index configured by the KNN_INDEX environment variable"""
+    kind = os.getenv('KNN_INDEX', 'brute')
+
+    if kind == 'lsh':
+        return LSHNeighborIndex(
+            n_components=int(os.getenv('KNN_SVD_COMPONENTS', 64)),
+            n_tables=int(os.getenv('KNN_LSH_TABLES', 8)),
+            n_bits=int(os.getenv('KNN_LSH_BITS', 12)),
+            min_candidates=int(os.getenv('KNN_LSH_MIN_CANDIDATES', 50))
+        )
+
+    if kind != 'brute':
+        logger.warning(f"Unknown KNN_INDEX '{kind}', using brute force")
+    return BruteForceNeighborIndex()
+
+
+def load_neighbor_index(reader: ArtifactReader):
+    """Load the neighbour index saved in a collaborative model artifact"""
+    if reader.meta.get('neighbor_index') == 'lsh':
+        return LSHNeighborIndex.load(reader)
+    return BruteForceNeighborIndex.load(reader)
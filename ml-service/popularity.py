@@ -0,0 +1,194 @@
+import threading
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PopularityState = namedtuple('PopularityState', [
+    'hotel_ids', 'hotel_index', 'ratings', 'recent_counts', 'total_counts', 'scores', 'popularity'
+])
+
+
+class PopularityTable:
+    """Per-hotel interaction counts, popularity scores and popular-hotel ranking held in memory.
+
+    Counts for every hotel come from one aggregation over userinteractions and
+    are stored as arrays aligned with the engine's hotel index, so scoring reads
+    never touch the database. A background thread refreshes them on a schedule,
+    and new interactions can be folded in incrementally between refreshes. The
+    first refresh also runs on that thread, so startup doesn't wait on it.
+    """
+
+    def __init__(self, collection, refresh_seconds: float = 300, recent_days: int = 30):
+        self.collection = collection
+        self.refresh_seconds = refresh_seconds
+        self.recent_days = recent_days
+        self._state = self._build_state([], np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._ranking = np.zeros(0, dtype=np.intp)
+        self._ranking_stale = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Set once the first background refresh has finished or failed
+        self.loaded = threading.Event()
+
+    def refresh(self, hotel_ids: Optional[List[str]] = None, ratings: Optional[List[float]] = None):
+        """Recompute counts for all hotels, optionally re-aligning to a new hotel index"""
+        state = self._state
+        realign = hotel_ids is not None
+        if not realign:
+            hotel_ids, ratings = state.hotel_ids, state.ratings
+        hotel_index = {hotel_id: i for i, hotel_id in enumerate(hotel_ids)}
+
+        pipeline = [
+            {
+                '$group': {
+                    '_id': '$hotelId',
+                    'total_count': {'$sum': 1},
+                    'recent_count': {
+                        '$sum': {
+                            '$cond': [
+                                {'$gte': ['$createdAt', datetime.now() - timedelta(days=self.recent_days)]},
+                                1,
+                                0
+                            ]
+                        }
+                    }
+                }
+            }
+        ]
+
+        recent_counts = np.zeros(len(hotel_ids), dtype=np.int64)
+        total_counts = np.zeros(len(hotel_ids), dtype=np.int64)
+        for row in self.collection.aggregate(pipeline):
+            idx = hotel_index.get(str(row['_id']))
+            if idx is not None:
+                recent_counts[idx] = row['recent_count']
+                total_counts[idx] = row['total_count']
+
+        if ratings is None:
+            ratings = np.zeros(len(hotel_ids))
+
+        # Publish the new arrays and ranking together
+        new_state = self._build_state(hotel_ids, ratings, recent_counts, total_counts)
+        with self._lock:
+            if not realign and self._state.hotel_ids is not state.hotel_ids:
+                # Re-aligned to a new hotel index meanwhile, with counts at least as fresh
+                return
+            self._state = new_state
+            self._ranking = self._rank(new_state.popularity)
+            self._ranking_stale = False
+        logger.info(f"Refreshed popularity table for {len(hotel_ids)} hotels")
+
+    def align(self, hotel_ids: List[str], ratings: Optional[List[float]] = None):
+        """Re-align to a new hotel index without querying, carrying over the counts of known hotels"""
+        with self._lock:
+            state = self._state
+            rows = np.array([state.hotel_index.get(hotel_id, -1) for hotel_id in hotel_ids], dtype=np.intp)
+            known = rows >= 0
+            recent_counts = np.zeros(len(hotel_ids), dtype=np.int64)
+            total_counts = np.zeros(len(hotel_ids), dtype=np.int64)
+            recent_counts[known] = state.recent_counts[rows[known]]
+            total_counts[known] = state.total_counts[rows[known]]
+
+            if ratings is None:
+                ratings = np.zeros(len(hotel_ids))
+            self._state = self._build_state(hotel_ids, ratings, recent_counts, total_counts)
+            self._ranking = self._rank(self._state.popularity)
+            self._ranking_stale = False
+
+    def record_interactions(self, hotel_ids: Iterable[str]):
+        """Fold new interactions into the counts without waiting for the next refresh"""
+        with self._lock:
+            state = self._state
+            indices = [state.hotel_index[str(hotel_id)] for hotel_id in hotel_ids if str(hotel_id) in state.hotel_index]
+            if not indices:
+                return
+
+            indices = np.asarray(indices)
+            np.add.at(state.recent_counts, indices, 1)
+            np.add.at(state.total_counts, indices, 1)
+
+            touched = np.unique(indices)
+            state.scores[touched] = self._popularity_scores(state.recent_counts[touched], state.total_counts[touched])
+            state.popularity[touched] = self._ranking_scores(state.ratings[touched], state.total_counts[touched])
+            self._ranking_stale = True
+
+    def aligned_scores(self, hotel_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Popularity scores and ranking scores ordered like hotel_ids, 0 for unknown hotels"""
+        state = self._state
+        if state.hotel_ids is hotel_ids:
+            return state.scores, state.popularity
+
+        rows = np.array([state.hotel_index.get(hotel_id, -1) for hotel_id in hotel_ids], dtype=np.intp)
+        known = rows >= 0
+        scores = np.zeros(len(hotel_ids))
+        popularity = np.zeros(len(hotel_ids))
+        scores[known] = state.scores[rows[known]]
+        popularity[known] = state.popularity[rows[known]]
+        return scores, popularity
+
+    def top_hotels(self, limit: int) -> List[Tuple[str, float]]:
+        """Most popular hotels as (hotel_id, popularity_score) pairs"""
+        with self._lock:
+            if self._ranking_stale:
+                self._ranking = self._rank(self._state.popularity)
+                self._ranking_stale = False
+            state, ranking = self._state, self._ranking
+
+        return [(state.hotel_ids[idx], float(state.popularity[idx])) for idx in ranking[:limit]]
+
+    def start(self):
+        """Start refreshing the table in the background, beginning with an immediate refresh"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, name='popularity-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh popularity table: {str(e)}")
+            self.loaded.set()
+
+            # A non-positive interval refreshes once at startup only
+            if self.refresh_seconds <= 0 or self._stop_event.wait(self.refresh_seconds):
+                return
+
+    @classmethod
+    def _build_state(cls, hotel_ids, ratings, recent_counts, total_counts) -> PopularityState:
+        ratings = np.nan_to_num(np.asarray(ratings, dtype=float))
+        return PopularityState(
+            hotel_ids=hotel_ids if isinstance(hotel_ids, list) else list(hotel_ids),
+            hotel_index={hotel_id: i for i, hotel_id in enumerate(hotel_ids)},
+            ratings=ratings,
+            recent_counts=recent_counts,
+            total_counts=total_counts,
+            scores=cls._popularity_scores(recent_counts, total_counts),
+            popularity=cls._ranking_scores(ratings, total_counts)
+        )
+
+    @staticmethod
+    def _popularity_scores(recent_counts: np.ndarray, total_counts: np.ndarray) -> np.ndarray:
+        # Popularity score (0-1): recent volume plus the share of interactions that are recent
+        recency_factor = recent_counts / np.maximum(total_counts, 1)
+        return np.where(total_counts > 0, np.minimum(1.0, recent_counts / 100 + recency_factor), 0.0)
+
+    @staticmethod
+    def _ranking_scores(ratings: np.ndarray, total_counts: np.ndarray) -> np.ndarray:
+        # Popular-hotel ranking: mostly rating, with a small boost per interaction
+        return ratings * 0.7 + total_counts * 0.001
+
+    @staticmethod
+    def _rank(popularity: np.ndarray) -> np.ndarray:
+        return np.argsort(-popularity, kind='stable')
@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def top_n_indices(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest scores in descending score order.
+
+    Uses argpartition so only the selected n entries are sorted.
+    """
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    if n < len(scores):
+        top = np.argpartition(-scores, n - 1)[:n]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
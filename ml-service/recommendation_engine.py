@@ -1,38 +1,135 @@
 import numpy as np
-import pandas as pd
+from array import array
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
 import pymongo
+from bson import ObjectId
 import os
 from datetime import datetime, timedelta
 import logging
-import joblib
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
+from hotel_store import HotelStore, DEFAULT_HOTEL_FIELDS, hotel_projection
+from attribute_index import HotelAttributeIndex
+from model_artifacts import ArtifactReader, ArtifactWriter, artifact_lock
+from hybrid_ranker import HybridRanker
+from collaborative_model import CollaborativeModel
+from matrix_factorization import MatrixFactorizationModel
+from similarity_index import SimilarHotelIndex
+from popularity import PopularityTable
+from model_snapshot import ModelSnapshot
+from recommendation_store import RecommendationStore
+from result_cache import ResultCache
+from trending_counters import TrendingCounters, utc_timestamp
+from user_profiles import UserProfileCache
+from user_behavior import BehaviorSummary, UserBehaviorSummaries
+import metrics
+import ranking
 
 logger = logging.getLogger(__name__)
 
+# Implicit feedback weight of each interaction type in the user-hotel matrix
+INTERACTION_WEIGHTS = {
+    'view': 1.0,
+    'click': 2.0,
+    'booking': 5.0
+}
+
+# Most recent interactions per user that go into a content profile
+PROFILE_INTERACTIONS = 50
+PROFILE_INTERACTION_FIELDS = {'_id': 0, 'userId': 1, 'hotelId': 1, 'interactionType': 1}
+
 class RecommendationEngine:
     def __init__(self):
         self.mongo_client = None
         self.db = None
-        self.tfidf_vectorizer = None
-        self.knn_model = None
-        self.scaler = StandardScaler()
-        self.hotel_features_matrix = None
-        self.hotel_ids = None
-        self.user_similarity_matrix = None
+        self.snapshot = ModelSnapshot(collaborative_backend=os.getenv('COLLABORATIVE_BACKEND', 'knn'))
+        self.hotel_store = None
+        self.popularity_table = None
+        self.recommendation_store = None
+        self.trending_counters = None
+        self.precompute_top_n = int(os.getenv('PRECOMPUTE_TOP_N', 50))
+        self.trending_cache = ResultCache(
+            ttl_seconds=float(os.getenv('TRENDING_CACHE_TTL', 60)),
+            stale_seconds=float(os.getenv('TRENDING_CACHE_STALE_SECONDS', 300))
+        )
+        self.hybrid_ranker = HybridRanker(
+            content_weight=float(os.getenv('HYBRID_CONTENT_WEIGHT', 0.6)),
+            collab_weight=float(os.getenv('HYBRID_COLLAB_WEIGHT', 0.4)),
+            popularity_weight=float(os.getenv('HYBRID_POPULARITY_WEIGHT', 0.1))
+        )
+        self.user_profiles = UserProfileCache(
+            max_size=int(os.getenv('USER_PROFILE_CACHE_SIZE', 10000)),
+            ttl_seconds=float(os.getenv('USER_PROFILE_TTL', 900))
+        )
+        self.user_behavior = UserBehaviorSummaries(
+            window_size=int(os.getenv('USER_BEHAVIOR_WINDOW', 100)),
+            max_size=int(os.getenv('USER_BEHAVIOR_CACHE_SIZE', 10000)),
+            ttl_seconds=float(os.getenv('USER_BEHAVIOR_TTL', 3600))
+        )
+        self._retrain_lock = threading.Lock()
+        # 'background' retrains stale models right after startup, 'lazy' on the first request,
+        # 'blocking' retrains everything before the service starts
+        self.startup_mode = os.getenv('MODEL_STARTUP_MODE', 'background')
+        self.max_staleness_seconds = float(os.getenv('MODEL_MAX_STALENESS_SECONDS', 3600))
+        self.stale_models = []
+        self._stale_lock = threading.Lock()
+        self._ready = threading.Event()
+        # Other workers sharing the models directory commit retrained artifacts; poll for them
+        self.reload_seconds = float(os.getenv('MODEL_RELOAD_SECONDS', 30))
+        self._reload_stop = threading.Event()
+        self._reload_thread = None
         
         self._connect_to_database()
         self._initialize_models()
+        self.popularity_table.start()
+        self.trending_counters.start()
+        self._start_model_reload()
+    
+    @property
+    def model_version(self) -> str:
+        """Version id of the models currently serving requests"""
+        return self.snapshot.version
+    
+    @property
+    def ready(self) -> bool:
+        """Whether models are loaded, or the first training attempt has finished"""
+        return self._ready.is_set()
     
     def _connect_to_database(self):
         """Connect to MongoDB database"""
         try:
             mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/booking-app')
-            self.mongo_client = pymongo.MongoClient(mongo_uri)
+            self.mongo_client = pymongo.MongoClient(mongo_uri, event_listeners=metrics.event_listeners())
             self.db = self.mongo_client.get_default_database()
+            self.hotel_store = HotelStore(
+                self.db.hotels,
+                max_size=int(os.getenv('HOTEL_CACHE_SIZE', 5000)),
+                ttl_seconds=float(os.getenv('HOTEL_CACHE_TTL', 300)),
+                projection=hotel_projection(
+                    os.getenv('HOTEL_FIELDS', DEFAULT_HOTEL_FIELDS),
+                    int(os.getenv('HOTEL_PHOTO_LIMIT', 1))
+                )
+            )
+            self.popularity_table = PopularityTable(
+                self.db.userinteractions,
+                refresh_seconds=float(os.getenv('POPULARITY_REFRESH_SECONDS', 300))
+            )
+            self.recommendation_store = RecommendationStore(
+                self.db.precomputedrecommendations,
+                ttl_seconds=float(os.getenv('PRECOMPUTED_TTL_SECONDS', 86400))
+            )
+            self.trending_counters = TrendingCounters(
+                self.db.userinteractions,
+                window_seconds=float(os.getenv('TRENDING_WINDOW_HOURS', 168)) * 3600,
+                bucket_seconds=float(os.getenv('TRENDING_BUCKET_MINUTES', 60)) * 60,
+                precision=int(os.getenv('TRENDING_HLL_PRECISION', 7)),
+                sketch_buckets=int(os.getenv('TRENDING_SKETCH_BUCKETS', 7)),
+                rebuild_seconds=float(os.getenv('TRENDING_REBUILD_SECONDS', 3600)),
+                batch_size=int(os.getenv('TRAINING_BATCH_SIZE', 10000))
+            )
             logger.info("Connected to MongoDB successfully")
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {str(e)}")
@@ -40,103 +137,251 @@ class RecommendationEngine:
     
     def _initialize_models(self):
         """Initialize or load existing ML models"""
+        # Warm start every model from its last persisted artifact and serve them right away;
+        # popularity counts and the trending window are recounted by their background threads
+        self.snapshot = self.snapshot.replace(**self._load_models(['content', 'collaborative', 'mf']))
+        if self.snapshot.has_content_model:
+            self._ready.set()
+        
+        if self.startup_mode == 'blocking':
+            self.retrain_models('all')
+            return
+        
+        # Stale models are retrained by a background job
+        collaborative_type = 'mf' if self.snapshot.collaborative_backend == 'mf' else 'collaborative'
         try:
-            # Try to load existing models
-            if os.path.exists('models/tfidf_vectorizer.pkl'):
-                self.tfidf_vectorizer = joblib.load('models/tfidf_vectorizer.pkl')
-                logger.info("Loaded existing TF-IDF vectorizer")
-            else:
-                self.tfidf_vectorizer = TfidfVectorizer(
-                    max_features=1000,
-                    stop_words='english',
-                    ngram_range=(1, 2)
-                )
-                logger.info("Created new TF-IDF vectorizer")
-            
-            if os.path.exists('models/knn_model.pkl'):
-                self.knn_model = joblib.load('models/knn_model.pkl')
-                logger.info("Loaded existing k-NN model")
-            else:
-                self.knn_model = NearestNeighbors(
-                    n_neighbors=10,
-                    metric='cosine',
-                    algorithm='brute'
-                )
-                logger.info("Created new k-NN model")
-                
-            # Initialize models with current data
-            self._train_content_based_model()
-            self._train_collaborative_model()
-            
+            self.stale_models = self._find_stale_models()
         except Exception as e:
-            logger.error(f"Failed to initialize models: {str(e)}")
+            logger.error(f"Failed to check persisted models against the data, retraining all: {str(e)}")
+            self.stale_models = ['content', collaborative_type]
+        if self.stale_models:
+            logger.info(f"Models to retrain after startup: {', '.join(self.stale_models)}")
+        if not self.stale_models:
+            self._ready.set()
     
-    def _train_content_based_model(self):
-        """Train TF-IDF content-based recommendation model"""
-        try:
-            # Get hotel data from database
-            hotels = list(self.db.hotels.find({}))
-            
-            if not hotels:
-                logger.warning("No hotels found in database")
-                return
-            
-            # Create content features for each hotel
-            hotel_contents = []
-            self.hotel_ids = []
-            
-            for hotel in hotels:
-                content = self._create_hotel_content_string(hotel)
-                hotel_contents.append(content)
-                self.hotel_ids.append(str(hotel['_id']))
-            
-            # Fit TF-IDF vectorizer and transform content
-            self.hotel_features_matrix = self.tfidf_vectorizer.fit_transform(hotel_contents)
-            
-            # Save the model
-            os.makedirs('models', exist_ok=True)
-            joblib.dump(self.tfidf_vectorizer, 'models/tfidf_vectorizer.pkl')
-            joblib.dump(self.hotel_features_matrix, 'models/hotel_features_matrix.pkl')
-            
-            logger.info(f"Trained content-based model with {len(hotels)} hotels")
-            
-        except Exception as e:
-            logger.error(f"Failed to train content-based model: {str(e)}")
+    def _find_stale_models(self) -> List[str]:
+        """Model types whose persisted artifact is missing or behind the data beyond the allowed staleness"""
+        collaborative_type = 'mf' if self.snapshot.collaborative_backend == 'mf' else 'collaborative'
+        return [model_type for model_type in ('content', collaborative_type) if self._is_stale(model_type)]
     
-    def _train_collaborative_model(self):
-        """Train k-NN collaborative filtering model"""
-        try:
-            # Get user interaction data
-            interactions = list(self.db.userinteractions.find({
-                'interactionType': {'$in': ['view', 'click', 'booking']}
-            }))
-            
-            if not interactions:
-                logger.warning("No user interactions found")
-                return
-            
-            # Create user-hotel interaction matrix
-            user_hotel_matrix = self._create_user_hotel_matrix(interactions)
-            
-            if user_hotel_matrix.empty:
-                logger.warning("Empty user-hotel matrix")
-                return
-            
-            # Normalize the matrix
-            user_features = self.scaler.fit_transform(user_hotel_matrix.fillna(0))
-            
-            # Train k-NN model
-            self.knn_model.fit(user_features)
-            
-            # Save the model
-            joblib.dump(self.knn_model, 'models/knn_model.pkl')
-            joblib.dump(self.scaler, 'models/scaler.pkl')
-            joblib.dump(user_hotel_matrix, 'models/user_hotel_matrix.pkl')
-            
-            logger.info(f"Trained collaborative model with {len(user_hotel_matrix)} users")
-            
-        except Exception as e:
-            logger.error(f"Failed to train collaborative model: {str(e)}")
+    def _is_stale(self, model_type: str) -> bool:
+        """Whether a model type's persisted artifact is missing or behind the data beyond the allowed staleness"""
+        reader = ArtifactReader.open('models', model_type)
+        if reader is None:
+            return True
+        
+        if model_type == 'content':
+            watermark = self._data_watermark(self.db.hotels, 'updatedAt')
+        else:
+            watermark = self._data_watermark(self.db.userinteractions)
+        if reader.meta.get('watermark') == watermark:
+            return False
+        
+        age = (datetime.now() - datetime.fromisoformat(reader.manifest['created_at'])).total_seconds()
+        return age > self.max_staleness_seconds
+    
+    def _data_watermark(self, collection, updated_field: Optional[str] = None) -> Dict[str, Any]:
+        """Cheap fingerprint of a collection's contents, recorded with the models trained on it"""
+        # Document count comes from collection metadata and the newest _id from the _id index
+        newest = collection.find_one({}, {'_id': 1}, sort=[('_id', pymongo.DESCENDING)])
+        watermark = {
+            'count': collection.estimated_document_count(),
+            'last_id': str(newest['_id']) if newest else None
+        }
+        
+        # In-place edits don't change the count or newest _id
+        if updated_field:
+            updated = collection.find_one({}, {updated_field: 1}, sort=[(updated_field, pymongo.DESCENDING)])
+            last_updated = updated.get(updated_field) if updated else None
+            watermark['last_updated'] = last_updated.isoformat() if isinstance(last_updated, datetime) else None
+        
+        return watermark
+    
+    def claim_stale_models(self) -> List[str]:
+        """Stale model types found at startup, handed out once so they are retrained once"""
+        with self._stale_lock:
+            stale, self.stale_models = self.stale_models, []
+        return stale
+    
+    def _save_content_model(self, tfidf_vectorizer: TfidfVectorizer, hotel_features_matrix: sparse.csr_matrix,
+                            hotel_ids: List[str], attribute_index: HotelAttributeIndex,
+                            watermark: Optional[Dict] = None):
+        """Persist the content-based model as a memory-mappable artifact"""
+        writer = ArtifactWriter('models', 'content')
+        writer.add_object('tfidf_vectorizer', tfidf_vectorizer)
+        writer.add_csr('hotel_features_matrix', hotel_features_matrix)
+        writer.add_ids('hotel_ids', hotel_ids)
+        attribute_index.save(writer)
+        writer.meta['watermark'] = watermark
+        writer.commit()
+    
+    def _load_models(self, model_types: Iterable[str]) -> Dict[str, Any]:
+        """Snapshot changes loading the current persisted artifact of each model type, memory-mapped.
+
+        Each artifact loads on its own, so one unreadable artifact doesn't discard
+        the others; model types without an artifact are left unchanged.
+        """
+        changes = {}
+        versions = {}
+        for model_type in model_types:
+            try:
+                reader = ArtifactReader.open('models', model_type)
+                if reader is None:
+                    continue
+                
+                if model_type == 'content':
+                    loaded, loaded_versions = self._load_content_model(reader)
+                elif model_type == 'collaborative':
+                    loaded, loaded_versions = {'collaborative_model': CollaborativeModel.from_reader(reader)}, {}
+                else:
+                    loaded, loaded_versions = {'mf_model': MatrixFactorizationModel.from_reader(reader)}, {}
+                
+                changes.update(loaded)
+                versions.update(loaded_versions, **{model_type: reader.version})
+                logger.info(f"Loaded {model_type} model version {reader.version}")
+            except Exception as e:
+                logger.error(f"Failed to load {model_type} model: {str(e)}")
+        
+        if versions:
+            changes['artifact_versions'] = {**self.snapshot.artifact_versions, **versions}
+        return changes
+    
+    def _load_content_model(self, reader: ArtifactReader) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Snapshot fields of a persisted content-based model and its similar-hotels index, with their versions"""
+        hotel_ids = reader.ids('hotel_ids')
+        attribute_index = HotelAttributeIndex.load(reader, hotel_ids)
+        
+        # The similar-hotels index is committed before the content model it belongs to
+        similar_reader = ArtifactReader.open('models', 'similar_hotels')
+        similar_hotel_index = SimilarHotelIndex.from_reader(similar_reader) if similar_reader is not None else None
+        
+        fields = {
+            'tfidf_vectorizer': reader.object('tfidf_vectorizer'),
+            'hotel_features_matrix': reader.csr('hotel_features_matrix'),
+            'hotel_ids': hotel_ids,
+            'hotel_index': {hotel_id: i for i, hotel_id in enumerate(hotel_ids)},
+            'attribute_index': attribute_index,
+            'similar_hotel_index': similar_hotel_index
+        }
+        
+        # Align popularity scores and ranking with the loaded hotel index; counts follow on the next refresh
+        self.popularity_table.align(hotel_ids, attribute_index.ratings)
+        
+        return fields, {'similar_hotels': similar_reader.version} if similar_reader is not None else {}
+    
+    def _create_tfidf_vectorizer(self) -> TfidfVectorizer:
+        """Create an unfitted TF-IDF vectorizer"""
+        return TfidfVectorizer(
+            max_features=1000,
+            stop_words='english',
+            ngram_range=(1, 2)
+        )
+    
+    def _train_content_based_model(self) -> Optional[Dict[str, Any]]:
+        """Train TF-IDF content-based recommendation model.
+
+        Returns the trained content models as snapshot fields without publishing
+        them, or None if there are no hotels to train on.
+        """
+        # Taken before reading, so writes that race with training mark the model stale
+        watermark = self._data_watermark(self.db.hotels, 'updatedAt')
+        
+        # Get hotel data from database
+        hotels = list(self.db.hotels.find({}))
+        
+        if not hotels:
+            logger.warning("No hotels found in database")
+            return None
+        
+        # Create content features for each hotel
+        hotel_contents = []
+        hotel_ids = []
+        
+        for hotel in hotels:
+            content = self._create_hotel_content_string(hotel)
+            hotel_contents.append(content)
+            hotel_ids.append(str(hotel['_id']))
+        
+        # Fit a fresh TF-IDF vectorizer so the serving one is never mutated
+        tfidf_vectorizer = self._create_tfidf_vectorizer()
+        hotel_features_matrix = tfidf_vectorizer.fit_transform(hotel_contents)
+        
+        # Precompute the top-K similar hotels for /recommendations/similar
+        similar_hotel_index = SimilarHotelIndex.build(
+            hotel_features_matrix,
+            hotel_ids,
+            k=int(os.getenv('SIMILAR_HOTELS_TOP_K', 50)),
+            memory_mb=float(os.getenv('SIMILARITY_BLOCK_MB', 256))
+        )
+        
+        attribute_index = HotelAttributeIndex.build(hotels)
+        
+        # Save the model; committing the content model last publishes both to other workers
+        similar_hotel_index.save('models')
+        self._save_content_model(tfidf_vectorizer, hotel_features_matrix, hotel_ids, attribute_index, watermark)
+        
+        # Re-align popularity scores and ranking with the new hotel index
+        self.popularity_table.refresh(hotel_ids, [hotel.get('rating') for hotel in hotels])
+        
+        logger.info(f"Trained content-based model with {len(hotels)} hotels")
+        
+        return {
+            'tfidf_vectorizer': tfidf_vectorizer,
+            'hotel_features_matrix': hotel_features_matrix,
+            'hotel_ids': hotel_ids,
+            'hotel_index': {hotel_id: i for i, hotel_id in enumerate(hotel_ids)},
+            'attribute_index': attribute_index,
+            'similar_hotel_index': similar_hotel_index
+        }
+    
+    def _train_collaborative_model(self) -> Optional[CollaborativeModel]:
+        """Train user k-NN collaborative filtering model"""
+        watermark = self._data_watermark(self.db.userinteractions)
+        matrix, user_ids, hotel_ids = self._load_user_hotel_matrix()
+        
+        if matrix.nnz == 0:
+            logger.warning("No user interactions found")
+            return None
+        
+        # Normalize the matrix and train k-NN model
+        collaborative_model = CollaborativeModel.fit(matrix, user_ids, hotel_ids)
+        collaborative_model.save('models', watermark)
+        
+        logger.info(f"Trained collaborative model with {collaborative_model.n_users} users")
+        return collaborative_model
+    
+    def _train_matrix_factorization_model(self) -> Optional[MatrixFactorizationModel]:
+        """Train implicit ALS matrix factorization collaborative filtering model"""
+        watermark = self._data_watermark(self.db.userinteractions)
+        matrix, user_ids, hotel_ids = self._load_user_hotel_matrix()
+        
+        if matrix.nnz == 0:
+            logger.warning("No user interactions found")
+            return None
+        
+        mf_model = MatrixFactorizationModel.fit(
+            matrix,
+            user_ids,
+            hotel_ids,
+            factors=int(os.getenv('MF_FACTORS', 32)),
+            regularization=float(os.getenv('MF_REGULARIZATION', 0.1)),
+            alpha=float(os.getenv('MF_ALPHA', 10)),
+            iterations=int(os.getenv('MF_ITERATIONS', 10))
+        )
+        mf_model.save('models', watermark)
+        
+        logger.info(f"Trained matrix factorization model with {len(user_ids)} users")
+        return mf_model
+    
+    def _load_user_hotel_matrix(self):
+        """Stream user interaction data in batches into the user-hotel matrix"""
+        # Fetch only the fields we need
+        interactions = self.db.userinteractions.find(
+            {'interactionType': {'$in': list(INTERACTION_WEIGHTS)}},
+            {'_id': 0, 'userId': 1, 'hotelId': 1, 'interactionType': 1}
+        ).batch_size(int(os.getenv('TRAINING_BATCH_SIZE', 10000)))
+        
+        return self._create_user_hotel_matrix(interactions)
     
     def _create_hotel_content_string(self, hotel: Dict) -> str:
         """Create content string for TF-IDF from hotel data"""
@@ -172,322 +417,378 @@ class RecommendationEngine:
         
         return ' '.join(filter(None, content_parts))
     
-    def _create_user_hotel_matrix(self, interactions: List[Dict]) -> pd.DataFrame:
-        """Create user-hotel interaction matrix for collaborative filtering"""
-        # Convert interactions to DataFrame
-        df = pd.DataFrame(interactions)
-        
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Create interaction scores
-        interaction_weights = {
-            'view': 1.0,
-            'click': 2.0,
-            'booking': 5.0
-        }
-        
-        df['score'] = df['interactionType'].map(interaction_weights)
-        
-        # Group by user and hotel, sum scores
-        user_hotel_scores = df.groupby(['userId', 'hotelId'])['score'].sum().reset_index()
-        
-        # Create pivot table
-        user_hotel_matrix = user_hotel_scores.pivot(
-            index='userId', 
-            columns='hotelId', 
-            values='score'
-        )
-        
-        return user_hotel_matrix
-    
+    def _create_user_hotel_matrix(self, interactions: Iterable[Dict]):
+        """Create sparse user-hotel interaction matrix for collaborative filtering.
+
+        Interactions are consumed one at a time into COO triplets, so memory
+        scales with the number of interactions rather than users x hotels.
+        Returns the CSR matrix with its user and hotel id lists.
+        """
+        user_index = {}
+        hotel_index = {}
+        rows = array('i')
+        cols = array('i')
+        scores = array('f')
+
+        for interaction in interactions:
+            score = INTERACTION_WEIGHTS.get(interaction.get('interactionType'))
+            if score is None:
+                continue
+
+            user_id = str(interaction['userId'])
+            hotel_id = str(interaction['hotelId'])
+            rows.append(user_index.setdefault(user_id, len(user_index)))
+            cols.append(hotel_index.setdefault(hotel_id, len(hotel_index)))
+            scores.append(score)
+
+        # Duplicate (user, hotel) pairs are summed when converting to CSR
+        matrix = sparse.coo_matrix(
+            (np.frombuffer(scores, dtype=np.float32), (np.frombuffer(rows, dtype=np.int32), np.frombuffer(cols, dtype=np.int32))),
+            shape=(len(user_index), len(hotel_index))
+        ).tocsr()
+
+        return matrix, list(user_index), list(hotel_index)
+
     def get_personalized_recommendations(self, user_id: str, limit: int = 10, filters: Dict = None) -> List[Dict]:
         """Get personalized recommendations using hybrid approach"""
         try:
-            # Get content-based recommendations
-            content_recs = self._get_content_based_recommendations(user_id, limit * 2)
+            # Serve fresh precomputed results for active users without scoring
+            with metrics.stage('precomputed'):
+                precomputed = self._get_precomputed_recommendations(user_id, limit, filters)
+            if precomputed is not None:
+                return precomputed
             
-            # Get collaborative recommendations
-            collab_recs = self._get_collaborative_recommendations(user_id, limit * 2)
+            # Serve the whole request from one consistent set of models
+            snapshot = self.snapshot
             
-            # Combine recommendations with hybrid scoring
-            hybrid_recs = self._combine_recommendations(content_recs, collab_recs, user_id)
-            
-            # Apply filters
-            if filters:
-                hybrid_recs = self._apply_filters(hybrid_recs, filters)
-            
-            # Return top recommendations
-            return hybrid_recs[:limit]
+            # Score and rank through the same pipeline as batch requests
+            return self._get_batch_chunk_recommendations(snapshot, [user_id], limit, filters).get(user_id, [])
             
         except Exception as e:
             logger.error(f"Error getting personalized recommendations: {str(e)}")
             return []
     
-    def _get_content_based_recommendations(self, user_id: str, limit: int) -> List[Dict]:
-        """Get content-based recommendations using TF-IDF"""
-        try:
-            # Get user preferences and interaction history
-            user_profile = self._build_user_content_profile(user_id)
-            
-            if not user_profile:
-                # Return popular hotels if no user profile
-                return self._get_popular_hotels(limit)
-            
-            # Calculate similarity with all hotels
-            user_vector = self.tfidf_vectorizer.transform([user_profile])
-            similarities = cosine_similarity(user_vector, self.hotel_features_matrix).flatten()
-            
-            # Get top similar hotels
-            top_indices = similarities.argsort()[-limit:][::-1]
-            
-            recommendations = []
-            for idx in top_indices:
-                hotel_id = self.hotel_ids[idx]
-                hotel = self.db.hotels.find_one({'_id': pymongo.ObjectId(hotel_id)})
-                if hotel:
-                    recommendations.append({
-                        'hotel': hotel,
-                        'score': float(similarities[idx]),
-                        'reason': 'content_similarity'
-                    })
-            
-            return recommendations
-            
-        except Exception as e:
-            logger.error(f"Error in content-based recommendations: {str(e)}")
-            return []
-
-    def _get_collaborative_recommendations(self, user_id: str, limit: int) -> List[Dict]:
-        """Get collaborative filtering recommendations using k-NN"""
+    def _get_precomputed_recommendations(self, user_id: str, limit: int, filters: Optional[Dict]) -> Optional[List[Dict]]:
+        """Serve recommendations from the precomputed store, or None to fall back to live scoring"""
         try:
-            # Load user-hotel matrix
-            if os.path.exists('models/user_hotel_matrix.pkl'):
-                user_hotel_matrix = joblib.load('models/user_hotel_matrix.pkl')
-            else:
-                return []
-
-            if user_id not in user_hotel_matrix.index:
-                return self._get_popular_hotels(limit)
-
-            # Get user's interaction vector
-            user_vector = user_hotel_matrix.loc[user_id].fillna(0).values.reshape(1, -1)
-            user_vector_scaled = self.scaler.transform(user_vector)
-
-            # Find similar users
-            distances, indices = self.knn_model.kneighbors(user_vector_scaled, n_neighbors=min(10, len(user_hotel_matrix)))
-
-            # Get recommendations from similar users
-            similar_users = user_hotel_matrix.iloc[indices[0]]
-            user_interactions = user_hotel_matrix.loc[user_id]
-
-            # Calculate weighted scores for hotels not interacted with by current user
-            recommendations = []
-            for hotel_id in user_hotel_matrix.columns:
-                if pd.isna(user_interactions[hotel_id]) or user_interactions[hotel_id] == 0:
-                    # Calculate weighted score from similar users
-                    weighted_score = 0
-                    total_weight = 0
-
-                    for i, similar_user_idx in enumerate(indices[0]):
-                        if i == 0:  # Skip the user themselves
-                            continue
+            entry = self.recommendation_store.get(user_id, self.model_version)
+            if entry is None:
+                return None
 
-                        similar_user = user_hotel_matrix.iloc[similar_user_idx]
-                        similarity = 1 / (1 + distances[0][i])  # Convert distance to similarity
+            hotels = self.hotel_store.get_many(rec['hotelId'] for rec in entry['recommendations'])
+            return self._precomputed_results(entry, hotels, limit, filters)
 
-                        if not pd.isna(similar_user[hotel_id]) and similar_user[hotel_id] > 0:
-                            weighted_score += similarity * similar_user[hotel_id]
-                            total_weight += similarity
+        except Exception as e:
+            logger.error(f"Error reading precomputed recommendations: {str(e)}")
+            return None
+
+    def _precomputed_results(self, entry: Dict, hotels: Dict[str, Dict], limit: int,
+                             filters: Optional[Dict]) -> Optional[List[Dict]]:
+        """Recommendations from a precomputed entry and its fetched hotels, or None to fall back to live scoring"""
+        stored = entry['recommendations']
+        recommendations = []
+        for rec in stored:
+            hotel = hotels.get(str(rec['hotelId']))
+            if hotel:
+                recommendations.append({
+                    'hotel': hotel,
+                    'score': rec['score'],
+                    'content_score': rec['content_score'],
+                    'collab_score': rec['collab_score'],
+                    'reasons': rec['reasons']
+                })
 
-                    if total_weight > 0:
-                        final_score = weighted_score / total_weight
-                        hotel = self.db.hotels.find_one({'_id': pymongo.ObjectId(hotel_id)})
-                        if hotel:
-                            recommendations.append({
-                                'hotel': hotel,
-                                'score': final_score,
-                                'reason': 'collaborative_filtering'
-                            })
+        if filters:
+            recommendations = self._apply_filters(recommendations, filters)
 
-            # Sort by score and return top recommendations
-            recommendations.sort(key=lambda x: x['score'], reverse=True)
-            return recommendations[:limit]
+        # A restrictive filter can exhaust a full stored list; live scoring may find more
+        if len(recommendations) < limit and len(stored) >= self.precompute_top_n:
+            return None
 
-        except Exception as e:
-            logger.error(f"Error in collaborative recommendations: {str(e)}")
-            return []
+        return recommendations[:limit]
 
-    def _build_user_content_profile(self, user_id: str) -> str:
-        """Build user content profile from interactions and preferences"""
+    def precompute_recommendations(self) -> Dict[str, Any]:
+        """Materialize top-N hybrid recommendations for all recently active users"""
         try:
-            profile_parts = []
+            started = time.monotonic()
+            active_since = datetime.now() - timedelta(days=int(os.getenv('PRECOMPUTE_ACTIVE_DAYS', 30)))
 
-            # Get user preferences
-            preferences = self.db.userpreferences.find_one({'userId': pymongo.ObjectId(user_id)})
-            if preferences:
-                # Add preferred cities
-                for city_pref in preferences.get('preferredCities', []):
-                    weight = int(city_pref.get('weight', 1))
-                    profile_parts.extend([city_pref['city']] * weight)
-
-                # Add preferred hotel types
-                for type_pref in preferences.get('preferredHotelTypes', []):
-                    weight = int(type_pref.get('weight', 1))
-                    profile_parts.extend([type_pref['type']] * weight)
-
-                # Add preferred amenities
-                for amenity_pref in preferences.get('preferredAmenities', []):
-                    importance = int(amenity_pref.get('importance', 1))
-                    profile_parts.extend([amenity_pref['amenity']] * importance)
-
-                # Add travel style
-                travel_style = preferences.get('travelStyle', '')
-                if travel_style:
-                    profile_parts.extend([travel_style] * 3)
-
-            # Get recent interactions
-            recent_interactions = list(self.db.userinteractions.find({
-                'userId': pymongo.ObjectId(user_id),
-                'createdAt': {'$gte': datetime.now() - timedelta(days=90)}
-            }).limit(50))
-
-            # Add content from interacted hotels
-            for interaction in recent_interactions:
-                hotel = self.db.hotels.find_one({'_id': interaction['hotelId']})
-                if hotel:
-                    weight = 3 if interaction['interactionType'] == 'booking' else 1
-                    hotel_content = self._create_hotel_content_string(hotel)
-                    profile_parts.extend([hotel_content] * weight)
-
-            return ' '.join(profile_parts)
+            pipeline = [
+                {'$match': {'createdAt': {'$gte': active_since}}},
+                {'$group': {'_id': '$userId'}}
+            ]
+            user_ids = [str(row['_id']) for row in self.db.userinteractions.aggregate(pipeline, allowDiskUse=True)]
+
+            model_version = self.model_version
+            stored = 0
+            for start in range(0, len(user_ids), 500):
+                # Stamp entries with the time scoring began, so interactions ingested meanwhile keep them stale
+                scored_at = datetime.now()
+                results = [
+                    result for result in self.get_batch_personalized_recommendations(
+                        user_ids[start:start + 500], limit=self.precompute_top_n
+                    )
+                    if 'recommendations' in result
+                ]
+                self.recommendation_store.put_many(results, model_version, scored_at)
+                stored += len(results)
+
+            logger.info(f"Precomputed recommendations for {stored} of {len(user_ids)} active users")
+            return {
+                'active_users': len(user_ids),
+                'stored': stored,
+                'model_version': model_version,
+                'duration_seconds': round(time.monotonic() - started, 3)
+            }
 
         except Exception as e:
-            logger.error(f"Error building user content profile: {str(e)}")
-            return ""
-
-    def _combine_recommendations(self, content_recs: List[Dict], collab_recs: List[Dict], user_id: str) -> List[Dict]:
-        """Combine content-based and collaborative recommendations"""
-        try:
-            # Create a dictionary to store combined scores
-            combined_scores = {}
-
-            # Add content-based recommendations (weight: 0.6)
-            for rec in content_recs:
-                hotel_id = str(rec['hotel']['_id'])
-                combined_scores[hotel_id] = {
-                    'hotel': rec['hotel'],
-                    'content_score': rec['score'] * 0.6,
-                    'collab_score': 0,
-                    'total_score': rec['score'] * 0.6,
-                    'reasons': ['content_similarity']
-                }
+            logger.error(f"Error precomputing recommendations: {str(e)}")
+            return {'error': str(e)}
 
-            # Add collaborative recommendations (weight: 0.4)
-            for rec in collab_recs:
-                hotel_id = str(rec['hotel']['_id'])
-                if hotel_id in combined_scores:
-                    combined_scores[hotel_id]['collab_score'] = rec['score'] * 0.4
-                    combined_scores[hotel_id]['total_score'] += rec['score'] * 0.4
-                    combined_scores[hotel_id]['reasons'].append('collaborative_filtering')
-                else:
-                    combined_scores[hotel_id] = {
-                        'hotel': rec['hotel'],
-                        'content_score': 0,
-                        'collab_score': rec['score'] * 0.4,
-                        'total_score': rec['score'] * 0.4,
-                        'reasons': ['collaborative_filtering']
-                    }
-
-            # Add popularity boost for trending hotels
-            for hotel_id, data in combined_scores.items():
-                popularity_score = self._get_hotel_popularity_score(hotel_id)
-                data['total_score'] += popularity_score * 0.1
-                if popularity_score > 0.5:
-                    data['reasons'].append('trending')
-
-            # Convert to list and sort by total score
-            recommendations = []
-            for hotel_id, data in combined_scores.items():
-                recommendations.append({
-                    'hotel': data['hotel'],
-                    'score': data['total_score'],
-                    'content_score': data['content_score'],
-                    'collab_score': data['collab_score'],
-                    'reasons': data['reasons']
-                })
+    def get_batch_personalized_recommendations(self, user_ids: List[str], limit: int = 10,
+                                               filters: Dict = None) -> Iterator[Dict]:
+        """Get personalized recommendations for many users, yielding one result per user.
+
+        Users are processed in chunks: each chunk fetches preferences and recent
+        interactions with one query apiece, builds every profile vector with one
+        vectorizer call, and scores all of them against the hotel matrix with a
+        single sparse matrix product.
+        """
+        snapshot = self.snapshot
+        chunk_size = int(os.getenv('BATCH_CHUNK_SIZE', 64))
+
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            valid_ids = [str(user_id) for user_id in chunk if ObjectId.is_valid(str(user_id))]
+
+            try:
+                results = self._get_batch_chunk_recommendations(snapshot, valid_ids, limit, filters)
+            except Exception as e:
+                logger.error(f"Error getting batch recommendations: {str(e)}")
+                results = {}
+
+            yield from self._batch_chunk_results(chunk, valid_ids, results)
+
+    @staticmethod
+    def _batch_chunk_results(chunk: List[str], valid_ids: List[str], results: Dict[str, List[Dict]]) -> Iterator[Dict]:
+        """One batch result per requested user of a chunk, in request order"""
+        for user_id in chunk:
+            user_id = str(user_id)
+            if user_id in results:
+                yield {'userId': user_id, 'recommendations': results[user_id]}
+            elif user_id not in valid_ids:
+                yield {'userId': user_id, 'error': 'invalid userId'}
+            else:
+                yield {'userId': user_id, 'error': 'failed to get recommendations'}
+
+    def _get_batch_chunk_recommendations(self, snapshot: ModelSnapshot, user_ids: List[str], limit: int,
+                                         filters: Optional[Dict]) -> Dict[str, List[Dict]]:
+        """Hybrid recommendations for one chunk of users, keyed by user id"""
+        if not user_ids:
+            return {}
+
+        if not snapshot.has_content_model:
+            # Nothing to align scores with until the first content training
+            popular = [
+                {'hotel': rec['hotel'], 'score': rec['score'], 'content_score': 0.0, 'collab_score': 0.0, 'reasons': ['popular']}
+                for rec in self._get_popular_hotels(limit)
+            ]
+            return {user_id: self._apply_filters(popular, filters) if filters else popular for user_id in user_ids}
+
+        with metrics.stage('profile'):
+            profiles = self._get_user_profiles(snapshot, user_ids)
+        ranked = self._rank_users(snapshot, user_ids, profiles, limit, filters)
+
+        with metrics.stage('hydration'):
+            # Hydrate every winning hotel in the chunk with one lookup
+            hotels = self.hotel_store.get_many(
+                snapshot.hotel_ids[rec['row']] for recs in ranked.values() for rec in recs
+            )
+            return self._hydrate_ranked(snapshot, ranked, hotels, limit, filters)
+
+    def _rank_users(self, snapshot: ModelSnapshot, user_ids: List[str], profiles: Dict[str, Optional[np.ndarray]],
+                    limit: int, filters: Optional[Dict]) -> Dict[str, List[Dict]]:
+        """Top hotel rows per user from already fetched profiles; only in-memory model work"""
+        with metrics.stage('filters'):
+            eligible = self._eligible_hotels(snapshot, filters)
+            mask = None if eligible is None else eligible(snapshot.hotel_ids)
+        if metrics.registry.enabled:
+            metrics.CANDIDATES.observe(len(snapshot.hotel_ids) if mask is None else int(mask.sum()), source='eligible')
+
+        with metrics.stage('popularity'):
+            popularity_scores, popularity_ranking = self.popularity_table.aligned_scores(snapshot.hotel_ids)
+
+        with metrics.stage('content_scoring'):
+            # Score every profiled user against the hotel matrix with one product
+            profiled_ids = [user_id for user_id in user_ids if profiles[user_id] is not None]
+            content_scores = {}
+            if profiled_ids:
+                similarities = snapshot.hotel_features_matrix.dot(
+                    np.vstack([profiles[user_id] for user_id in profiled_ids]).T
+                ).T
+                content_scores = {user_id: similarities[row] for row, user_id in enumerate(profiled_ids)}
+
+        ranked = {}
+        for user_id in user_ids:
+            content = content_scores.get(user_id)
+            with metrics.stage('collaborative_scoring'):
+                collab = self._get_collaborative_scores(snapshot, user_id)
+            if collab is not None and metrics.registry.enabled:
+                metrics.CANDIDATES.observe(int(np.isfinite(collab).sum()), source='collaborative')
+
+            with metrics.stage('combine'):
+                # Users without a profile or collaborative history fall back to the popularity ranking
+                ranked[user_id] = self.hybrid_ranker.rank(
+                    popularity_ranking if content is None else content,
+                    popularity_ranking if collab is None else collab,
+                    popularity_scores,
+                    limit,
+                    mask,
+                    content_reason='popular' if content is None else 'content_similarity',
+                    collab_reason='popular' if collab is None else 'collaborative_filtering'
+                )
 
-            recommendations.sort(key=lambda x: x['score'], reverse=True)
-            return recommendations
+        return ranked
 
-        except Exception as e:
-            logger.error(f"Error combining recommendations: {str(e)}")
-            return content_recs + collab_recs
+    def _hydrate_ranked(self, snapshot: ModelSnapshot, ranked: Dict[str, List[Dict]], hotels: Dict[str, Dict],
+                        limit: int, filters: Optional[Dict]) -> Dict[str, List[Dict]]:
+        """Attach fetched hotel documents to ranked rows and apply the filters the mask can't"""
+        results = {}
+        for user_id, recs in ranked.items():
+            hybrid_recs = []
+            for rec in recs:
+                hotel = hotels.get(snapshot.hotel_ids[rec.pop('row')])
+                if hotel:
+                    hybrid_recs.append({'hotel': hotel, **rec})
 
-    def _get_hotel_popularity_score(self, hotel_id: str) -> float:
-        """Calculate hotel popularity score based on recent interactions"""
-        try:
-            # Count recent interactions (last 30 days)
-            recent_count = self.db.userinteractions.count_documents({
-                'hotelId': pymongo.ObjectId(hotel_id),
-                'createdAt': {'$gte': datetime.now() - timedelta(days=30)}
-            })
+            if filters:
+                hybrid_recs = self._apply_filters(hybrid_recs, filters)
+            results[user_id] = hybrid_recs[:limit]
 
-            # Count total interactions
-            total_count = self.db.userinteractions.count_documents({
-                'hotelId': pymongo.ObjectId(hotel_id)
-            })
+        return results
 
-            # Calculate popularity score (0-1)
-            if total_count == 0:
-                return 0
+    def _get_collaborative_scores(self, snapshot: ModelSnapshot, user_id: str) -> Optional[np.ndarray]:
+        """Active collaborative backend's scores aligned with hotel_ids, NaN where unscored.
 
-            recency_factor = recent_count / max(total_count, 1)
-            popularity_score = min(1.0, (recent_count / 100) + recency_factor)
+        Returns None if the backend does not know the user.
+        """
+        scores = np.full(len(snapshot.hotel_ids), np.nan)
+        model = snapshot.active_collaborative_model
+        if model is None:
+            return scores
 
-            return popularity_score
+        user_row = model.user_row(user_id)
+        if user_row is None:
+            return None
 
-        except Exception as e:
-            logger.error(f"Error calculating popularity score: {str(e)}")
-            return 0
+        if snapshot.collaborative_backend == 'mf':
+            column_scores = model.score_unseen_hotels(user_row)
+            columns = np.arange(len(column_scores))
+        else:
+            # Score unseen hotels from similar users
+            neighbor_rows, similarities = model.nearest_users(user_row, n_neighbors=9)
+            columns, column_scores = model.score_unseen_hotels(user_row, neighbor_rows, similarities)
+
+        rows = snapshot.collaborative_hotel_rows[columns]
+        keep = (rows >= 0) & np.isfinite(column_scores)
+        scores[rows[keep]] = column_scores[keep]
+        return scores
+
+    def _get_user_profiles(self, snapshot: ModelSnapshot, user_ids: List[str]) -> Dict[str, Optional[np.ndarray]]:
+        """Content profile vectors for users, building cache misses from one preferences and one interactions query"""
+        profiles, missing = self._cached_user_profiles(snapshot, user_ids)
+        if not missing:
+            return profiles
+
+        preferences_query, interactions_query, interactions_pipeline = self._profile_queries(missing)
+        preferences = self.db.userpreferences.find(preferences_query)
+        if interactions_pipeline is None:
+            interactions = self.db.userinteractions.find(interactions_query, PROFILE_INTERACTION_FIELDS) \
+                .sort('createdAt', -1).limit(PROFILE_INTERACTIONS)
+        else:
+            interactions = self.db.userinteractions.aggregate(interactions_pipeline)
+
+        profiles.update(self._build_user_profiles(snapshot, missing, preferences, interactions))
+        return profiles
+
+    def _cached_user_profiles(self, snapshot: ModelSnapshot,
+                              user_ids: List[str]) -> Tuple[Dict[str, Optional[np.ndarray]], List[str]]:
+        """(profiles, missing): cached profiles by user id and the users whose profile must be built"""
+        profiles = {}
+        missing = []
+        for user_id in user_ids:
+            found, profile = self.user_profiles.get(user_id, snapshot.version)
+            if found or not ObjectId.is_valid(user_id):
+                profiles[user_id] = profile
+            else:
+                missing.append(user_id)
+        return profiles, missing
+
+    @staticmethod
+    def _profile_queries(user_ids: List[str]) -> Tuple[Dict, Dict, Optional[List[Dict]]]:
+        """Preferences query, recent interactions query, and for several users a pipeline capping each one.
+
+        A single user's newest interactions are a sorted find limited to
+        PROFILE_INTERACTIONS, and the pipeline is None.
+        """
+        object_ids = [ObjectId(user_id) for user_id in user_ids]
+        interactions_query = {'userId': {'$in': object_ids}, 'createdAt': {'$gte': datetime.now() - timedelta(days=90)}}
+        if len(object_ids) == 1:
+            return {'userId': {'$in': object_ids}}, interactions_query, None
+
+        # Cap every user on the server rather than shipping whole histories for a chunk
+        pipeline = [
+            {'$match': interactions_query},
+            {'$sort': {'createdAt': -1}},
+            {'$group': {
+                '_id': '$userId',
+                'interactions': {'$push': {'hotelId': '$hotelId', 'interactionType': '$interactionType'}}
+            }},
+            {'$project': {'interactions': {'$slice': ['$interactions', PROFILE_INTERACTIONS]}}},
+            {'$unwind': '$interactions'},
+            {'$project': {
+                '_id': 0,
+                'userId': '$_id',
+                'hotelId': '$interactions.hotelId',
+                'interactionType': '$interactions.interactionType'
+            }}
+        ]
+        return {'userId': {'$in': object_ids}}, interactions_query, pipeline
+
+    def _build_user_profiles(self, snapshot: ModelSnapshot, user_ids: List[str], preferences: Iterable[Dict],
+                             interactions: Iterable[Dict]) -> Dict[str, Optional[np.ndarray]]:
+        """Build and cache profiles from fetched preferences and newest-first interactions"""
+        preferences = {str(preference['userId']): preference for preference in preferences}
+        recent = {user_id: [] for user_id in user_ids}
+        for interaction in interactions:
+            user_interactions = recent[str(interaction['userId'])]
+            if len(user_interactions) < PROFILE_INTERACTIONS:
+                user_interactions.append(interaction)
+
+        profiles = {}
+        for user_id in user_ids:
+            profile = self.user_profiles.build(snapshot, preferences.get(user_id), recent[user_id])
+            self.user_profiles.put(user_id, snapshot.version, profile)
+            profiles[user_id] = profile
+
+        return profiles
 
     def _get_popular_hotels(self, limit: int) -> List[Dict]:
         """Get popular hotels as fallback recommendations"""
         try:
-            # Get hotels with highest ratings and most interactions
-            pipeline = [
-                {
-                    '$lookup': {
-                        'from': 'userinteractions',
-                        'localField': '_id',
-                        'foreignField': 'hotelId',
-                        'as': 'interactions'
-                    }
-                },
-                {
-                    '$addFields': {
-                        'interaction_count': {'$size': '$interactions'},
-                        'popularity_score': {
-                            '$add': [
-                                {'$multiply': ['$rating', 0.7]},
-                                {'$multiply': [{'$size': '$interactions'}, 0.001]}
-                            ]
-                        }
-                    }
-                },
-                {'$sort': {'popularity_score': -1}},
-                {'$limit': limit}
-            ]
-
-            popular_hotels = list(self.db.hotels.aggregate(pipeline))
+            # Read the top of the materialized popularity ranking
+            popular = self.popularity_table.top_hotels(limit)
+            hotels = self.hotel_store.get_many(hotel_id for hotel_id, _ in popular)
 
             recommendations = []
-            for hotel in popular_hotels:
-                recommendations.append({
-                    'hotel': hotel,
-                    'score': hotel.get('popularity_score', 0),
-                    'reason': 'popular'
-                })
+            for hotel_id, popularity_score in popular:
+                hotel = hotels.get(hotel_id)
+                if hotel:
+                    recommendations.append({
+                        'hotel': hotel,
+                        'score': popularity_score,
+                        'reason': 'popular'
+                    })
 
             return recommendations
 
@@ -495,6 +796,20 @@ class RecommendationEngine:
             logger.error(f"Error getting popular hotels: {str(e)}")
             return []
 
+    def _eligible_hotels(self, snapshot: ModelSnapshot, filters: Optional[Dict]) -> Optional[Callable[[List[str]], np.ndarray]]:
+        """Map a model's hotel ids to a mask of hotels passing the filters, or None if nothing is filtered"""
+        if not filters or snapshot.attribute_index is None:
+            return None
+
+        try:
+            mask = snapshot.attribute_index.mask(filters)
+        except Exception as e:
+            # _apply_filters still runs on the final list
+            logger.error(f"Error building filter mask: {str(e)}")
+            return None
+
+        return lambda hotel_ids: snapshot.attribute_index.align(mask, hotel_ids)
+
     def _apply_filters(self, recommendations: List[Dict], filters: Dict) -> List[Dict]:
         """Apply filters to recommendations"""
         try:
@@ -545,33 +860,28 @@ class RecommendationEngine:
     def get_similar_hotels(self, hotel_id: str, limit: int = 5) -> List[Dict]:
         """Get hotels similar to a given hotel using content-based similarity"""
         try:
-            if not self.hotel_features_matrix or not self.hotel_ids:
-                return []
-
-            # Find the index of the given hotel
-            if hotel_id not in self.hotel_ids:
+            snapshot = self.snapshot
+            if not snapshot.has_content_model:
                 return []
 
-            hotel_idx = self.hotel_ids.index(hotel_id)
+            # Read the precomputed neighbours, computing live only for hotels added after training
+            similar = None
+            if snapshot.similar_hotel_index is not None:
+                similar = snapshot.similar_hotel_index.lookup(hotel_id, limit)
+            if similar is None:
+                similar = self._compute_similar_hotels(snapshot, hotel_id, limit)
 
-            # Calculate similarity with all other hotels
-            hotel_vector = self.hotel_features_matrix[hotel_idx]
-            similarities = cosine_similarity(hotel_vector, self.hotel_features_matrix).flatten()
-
-            # Get top similar hotels (excluding the hotel itself)
-            similar_indices = similarities.argsort()[-limit-1:-1][::-1]
+            hotels = self.hotel_store.get_many(similar_id for similar_id, _ in similar)
 
             similar_hotels = []
-            for idx in similar_indices:
-                if idx != hotel_idx:  # Exclude the hotel itself
-                    similar_hotel_id = self.hotel_ids[idx]
-                    hotel = self.db.hotels.find_one({'_id': pymongo.ObjectId(similar_hotel_id)})
-                    if hotel:
-                        similar_hotels.append({
-                            'hotel': hotel,
-                            'similarity_score': float(similarities[idx]),
-                            'reason': 'content_similarity'
-                        })
+            for similar_id, score in similar:
+                hotel = hotels.get(similar_id)
+                if hotel:
+                    similar_hotels.append({
+                        'hotel': hotel,
+                        'similarity_score': score,
+                        'reason': 'content_similarity'
+                    })
 
             return similar_hotels[:limit]
 
@@ -579,66 +889,118 @@ class RecommendationEngine:
             logger.error(f"Error getting similar hotels: {str(e)}")
             return []
 
+    def _compute_similar_hotels(self, snapshot: ModelSnapshot, hotel_id: str, limit: int) -> List[tuple]:
+        """Compute similar hotels live against the full feature matrix"""
+        hotel_idx = snapshot.hotel_index.get(hotel_id)
+
+        if hotel_idx is not None:
+            hotel_vector = snapshot.hotel_features_matrix[hotel_idx]
+        else:
+            # The hotel store holds projected documents; the content string needs the whole one
+            hotel = self.db.hotels.find_one({'_id': ObjectId(hotel_id)}) if ObjectId.is_valid(hotel_id) else None
+            if not hotel:
+                return []
+            hotel_vector = snapshot.tfidf_vectorizer.transform([self._create_hotel_content_string(hotel)])
+
+        similarities = cosine_similarity(hotel_vector, snapshot.hotel_features_matrix).flatten()
+
+        # Exclude the hotel itself
+        if hotel_idx is not None:
+            similarities[hotel_idx] = -np.inf
+
+        top_indices = ranking.top_n_indices(similarities, limit)
+        return [(snapshot.hotel_ids[idx], float(similarities[idx])) for idx in top_indices]
+
     def get_trending_hotels(self, limit: int = 10, city: Optional[str] = None) -> List[Dict]:
         """Get trending hotels based on recent interactions"""
         try:
-            # Build aggregation pipeline
-            match_stage = {
-                'createdAt': {'$gte': datetime.now() - timedelta(days=7)}
-            }
+            key = (city.lower() if city else None, limit)
+            return self.trending_cache.get(key, lambda: self._compute_trending_hotels(limit, city))
 
-            pipeline = [
-                {'$match': match_stage},
-                {
-                    '$group': {
-                        '_id': '$hotelId',
-                        'interaction_count': {'$sum': 1},
-                        'unique_users': {'$addToSet': '$userId'},
-                        'avg_duration': {'$avg': '$duration'}
-                    }
-                },
-                {
-                    '$addFields': {
-                        'unique_user_count': {'$size': '$unique_users'},
-                        'trending_score': {
-                            '$add': [
-                                {'$multiply': ['$interaction_count', 0.6]},
-                                {'$multiply': ['$unique_user_count', 0.4]}
-                            ]
-                        }
-                    }
-                },
-                {'$sort': {'trending_score': -1}},
-                {'$limit': limit * 2}  # Get more to filter by city if needed
-            ]
+        except Exception as e:
+            logger.error(f"Error getting trending hotels: {str(e)}")
+            return []
 
-            trending_data = list(self.db.userinteractions.aggregate(pipeline))
+    def _compute_trending_hotels(self, limit: int, city: Optional[str]) -> List[Dict]:
+        """Rank hotels from the in-memory trending counters and hydrate the winners"""
+        trending_data = self.trending_counters.top_hotels(limit * 2)  # Get more to filter by city if needed
+        hotels = self.hotel_store.get_many(data['_id'] for data in trending_data)
+
+        # Get hotel details and apply city filter
+        trending_hotels = []
+        for data in trending_data:
+            hotel = hotels.get(str(data['_id']))
+            if hotel:
+                # Apply city filter if specified
+                if city and hotel.get('city', '').lower() != city.lower():
+                    continue
+
+                trending_hotels.append({
+                    'hotel': hotel,
+                    'trending_score': data['trending_score'],
+                    'interaction_count': data['interaction_count'],
+                    'unique_users': data['unique_user_count'],
+                    'reason': 'trending'
+                })
 
-            # Get hotel details and apply city filter
-            trending_hotels = []
-            for data in trending_data:
-                hotel = self.db.hotels.find_one({'_id': data['_id']})
-                if hotel:
-                    # Apply city filter if specified
-                    if city and hotel.get('city', '').lower() != city.lower():
-                        continue
+                if len(trending_hotels) >= limit:
+                    break
+
+        return trending_hotels
+
+    def ingest_interactions(self, events: List[Dict]) -> Dict[str, int]:
+        """Fold newly tracked interactions into the trending counters, popularity table and user profiles"""
+        parsed = []
+        interaction_types = []
+        for event in events:
+            try:
+                hotel_id = event.get('hotelId')
+                if not hotel_id:
+                    continue
+                created_at = event.get('createdAt')
+                timestamp = (
+                    utc_timestamp(datetime.fromisoformat(str(created_at).replace('Z', '+00:00')))
+                    if created_at else time.time()
+                )
+                parsed.append((str(hotel_id), event.get('userId'), timestamp))
+                interaction_types.append(event.get('interactionType') or 'view')
+            except (AttributeError, ValueError) as e:
+                logger.warning(f"Skipping malformed interaction event: {str(e)}")
 
-                    trending_hotels.append({
-                        'hotel': hotel,
-                        'trending_score': data['trending_score'],
-                        'interaction_count': data['interaction_count'],
-                        'unique_users': data['unique_user_count'],
-                        'reason': 'trending'
-                    })
+        accepted = self.trending_counters.add(parsed)
+        self.popularity_table.record_interactions(hotel_id for hotel_id, _, _ in parsed)
+        self.user_profiles.invalidate(user_id for _, user_id, _ in parsed if user_id)
+        self._invalidate_precomputed({str(user_id) for _, user_id, _ in parsed if user_id})
+        self._record_user_behavior(parsed, interaction_types)
+
+        return {'received': len(events), 'accepted': accepted}
 
-                    if len(trending_hotels) >= limit:
-                        break
+    def _invalidate_precomputed(self, user_ids: set):
+        """Drop precomputed recommendations of users with new interactions, so they are scored live"""
+        try:
+            if user_ids:
+                self.recommendation_store.invalidate(list(user_ids))
+        except Exception as e:
+            logger.error(f"Error invalidating precomputed recommendations: {str(e)}")
+
+    def _record_user_behavior(self, parsed: List[Tuple[str, Any, float]], interaction_types: List[str]):
+        """Add ingested interactions to the behavior summaries of users that have one"""
+        try:
+            tracked = self.user_behavior.tracked({str(user_id) for _, user_id, _ in parsed if user_id})
+            events = sorted(
+                (timestamp, str(user_id), hotel_id, interaction_type)
+                for (hotel_id, user_id, timestamp), interaction_type in zip(parsed, interaction_types)
+                if user_id and str(user_id) in tracked
+            )
+            if not events:
+                return
 
-            return trending_hotels
+            hotels = self.hotel_store.get_many(hotel_id for _, _, hotel_id, _ in events)
+            for _, user_id, hotel_id, interaction_type in events:
+                self.user_behavior.record(user_id, hotels.get(hotel_id), interaction_type)
 
         except Exception as e:
-            logger.error(f"Error getting trending hotels: {str(e)}")
-            return []
+            logger.error(f"Error updating user behavior summaries: {str(e)}")
 
     def analyze_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Analyze user profile for insights"""
@@ -651,7 +1013,7 @@ class RecommendationEngine:
             }
 
             # Get user preferences
-            preferences = self.db.userpreferences.find_one({'userId': pymongo.ObjectId(user_id)})
+            preferences = self.db.userpreferences.find_one({'userId': ObjectId(user_id)})
             if preferences:
                 profile['preferences'] = {
                     'preferred_cities': preferences.get('preferredCities', []),
@@ -660,52 +1022,11 @@ class RecommendationEngine:
                     'travel_style': preferences.get('travelStyle', 'leisure')
                 }
 
-            # Analyze interaction patterns
-            interactions = list(self.db.userinteractions.find({
-                'userId': pymongo.ObjectId(user_id)
-            }).sort('createdAt', -1).limit(100))
-
-            if interactions:
-                # Most viewed cities
-                city_counts = {}
-                type_counts = {}
-                interaction_type_counts = {}
-
-                for interaction in interactions:
-                    hotel = self.db.hotels.find_one({'_id': interaction['hotelId']})
-                    if hotel:
-                        city = hotel.get('city', 'Unknown')
-                        hotel_type = hotel.get('type', 'Unknown')
-
-                        city_counts[city] = city_counts.get(city, 0) + 1
-                        type_counts[hotel_type] = type_counts.get(hotel_type, 0) + 1
-
-                    int_type = interaction['interactionType']
-                    interaction_type_counts[int_type] = interaction_type_counts.get(int_type, 0) + 1
-
-                profile['behavior_patterns'] = {
-                    'most_viewed_cities': sorted(city_counts.items(), key=lambda x: x[1], reverse=True)[:5],
-                    'preferred_hotel_types': sorted(type_counts.items(), key=lambda x: x[1], reverse=True)[:3],
-                    'interaction_distribution': interaction_type_counts,
-                    'total_interactions': len(interactions)
-                }
-
-            # Get booking history
-            bookings = list(self.db.bookings.find({
-                'userId': pymongo.ObjectId(user_id)
-            }).sort('createdAt', -1).limit(10))
-
-            if bookings:
-                total_spent = sum(booking.get('totalAmount', 0) for booking in bookings)
-                avg_rating_given = sum(booking.get('rating', {}).get('overall', 0) for booking in bookings if booking.get('rating', {}).get('overall', 0) > 0)
-                rated_bookings = len([b for b in bookings if b.get('rating', {}).get('overall', 0) > 0])
-
-                profile['behavior_patterns']['booking_stats'] = {
-                    'total_bookings': len(bookings),
-                    'total_spent': total_spent,
-                    'average_rating_given': avg_rating_given / max(rated_bookings, 1),
-                    'recent_bookings': len([b for b in bookings if b['createdAt'] > datetime.now() - timedelta(days=90)])
-                }
+            # Interaction patterns and booking history come from the user's maintained summary
+            behavior = self._describe_user_behavior(user_id)
+            profile['behavior_patterns'] = behavior['behavior_patterns']
+            if behavior['booking_stats']:
+                profile['behavior_patterns']['booking_stats'] = behavior['booking_stats']
 
             return profile
 
@@ -713,21 +1034,151 @@ class RecommendationEngine:
             logger.error(f"Error analyzing user profile: {str(e)}")
             return {'error': str(e)}
 
-    def retrain_models(self, model_type: str = 'all') -> Dict[str, str]:
-        """Retrain ML models with latest data"""
-        try:
-            results = {}
+    def _describe_user_behavior(self, user_id: str) -> Dict:
+        """A user's behavior summary, built from MongoDB only when it isn't maintained already"""
+        behavior = self.user_behavior.describe(user_id)
+        if behavior is None:
+            summary = self._build_behavior_summary(user_id)
+            summary.bookings = self._recent_bookings(user_id)
+            behavior = summary.describe()
+            self.user_behavior.put(user_id, summary)
+        elif not behavior['bookings_loaded']:
+            self.user_behavior.set_bookings(user_id, self._recent_bookings(user_id))
+            behavior = self.user_behavior.describe(user_id) or behavior
+        return behavior
+
+    def _build_behavior_summary(self, user_id: str) -> BehaviorSummary:
+        """Summary of a user's most recent interactions, with hotels hydrated from the hotel cache"""
+        interactions = list(self.db.userinteractions.find(
+            {'userId': ObjectId(user_id)},
+            {'hotelId': 1, 'interactionType': 1, '_id': 0}
+        ).sort('createdAt', -1).limit(self.user_behavior.window_size))
+
+        hotels = self.hotel_store.get_many(interaction['hotelId'] for interaction in interactions)
+        summary = BehaviorSummary(self.user_behavior.window_size)
+        # Oldest first, so the newest interaction ends up the most recent in the summary
+        for interaction in reversed(interactions):
+            hotel = hotels.get(str(interaction['hotelId']))
+            if hotel:
+                summary.add(hotel.get('city', 'Unknown'), hotel.get('type', 'Unknown'), interaction['interactionType'])
+            else:
+                summary.add(None, None, interaction['interactionType'])
+        return summary
+
+    def _recent_bookings(self, user_id: str) -> List[Dict]:
+        bookings = self.db.bookings.find(
+            {'userId': ObjectId(user_id)},
+            {'totalAmount': 1, 'rating.overall': 1, 'createdAt': 1, '_id': 0}
+        ).sort('createdAt', -1).limit(10)
+        return [
+            {
+                'totalAmount': booking.get('totalAmount', 0),
+                'rating': booking.get('rating', {}).get('overall', 0),
+                'createdAt': booking['createdAt']
+            }
+            for booking in bookings
+        ]
+
+    def retrain_models(self, model_type: str = 'all', stale_only: bool = False) -> Dict[str, str]:
+        """Retrain ML models with latest data and publish them as a new snapshot.
 
-            if model_type in ['all', 'content']:
-                self._train_content_based_model()
-                results['content_model'] = 'retrained successfully'
+        With stale_only, a model another worker already refreshed is loaded
+        from its artifact instead of being trained again.
+        """
+        try:
+            # Retrains run one at a time; requests keep using the current snapshot meanwhile
+            with self._retrain_lock:
+                backend = self.snapshot.collaborative_backend
+                trainers = []
+                if model_type in ['all', 'content']:
+                    trainers.append(('content', 'content_model', self._train_content_based_model, 'no hotels found'))
+                # 'all' retrains whichever collaborative backend is currently serving
+                if model_type == 'collaborative' or (model_type == 'all' and backend == 'knn'):
+                    trainers.append(('collaborative', 'collaborative_model', self._train_collaborative_model, 'no interactions found'))
+                if model_type == 'mf' or (model_type == 'all' and backend == 'mf'):
+                    trainers.append(('mf', 'mf_model', self._train_matrix_factorization_model, 'no interactions found'))
+
+                if not trainers:
+                    return {'error': f"Unknown model type: {model_type}"}
+
+                results = {}
+                for name, result_key, train, empty_result in trainers:
+                    # Workers sharing the models directory train and commit one at a time
+                    with artifact_lock('models', name):
+                        if stale_only and not self._is_stale(name):
+                            results[result_key] = 'already up to date'
+                            continue
+                        with metrics.timer(metrics.TRAINING_SECONDS, model=name):
+                            trained = train()
+                    results[result_key] = 'retrained successfully' if trained is not None else empty_result
 
-            if model_type in ['all', 'collaborative']:
-                self._train_collaborative_model()
-                results['collaborative_model'] = 'retrained successfully'
+                # Serve the committed artifacts memory-mapped, like every other worker will
+                changes = self._load_models(self._changed_models(name for name, *_ in trainers))
+                if 'collaborative_model' in changes and model_type != 'all':
+                    changes['collaborative_backend'] = 'knn'
+                if 'mf_model' in changes and model_type != 'all':
+                    changes['collaborative_backend'] = 'mf'
+                self._publish(changes)
 
-            return results
+                results['model_version'] = self.snapshot.version
+                return results
 
         except Exception as e:
             logger.error(f"Error retraining models: {str(e)}")
             return {'error': str(e)}
+        
+        finally:
+            # A service that started without models becomes ready once the first retrain finishes
+            self._ready.set()
+
+    def reload_models(self) -> bool:
+        """Swap in model artifacts another worker committed since the current snapshot was loaded"""
+        # A retrain in progress here publishes the latest artifacts itself
+        if not self._retrain_lock.acquire(blocking=False):
+            return False
+        try:
+            collaborative_type = 'mf' if self.snapshot.collaborative_backend == 'mf' else 'collaborative'
+            changed = self._changed_models(['content', collaborative_type])
+            if not changed:
+                return False
+            logger.info(f"Reloading models committed by another worker: {', '.join(changed)}")
+            self._publish(self._load_models(changed))
+            return True
+        finally:
+            self._retrain_lock.release()
+
+    def _changed_models(self, model_types: Iterable[str]) -> List[str]:
+        """Model types whose committed artifact version differs from the one being served"""
+        served = self.snapshot.artifact_versions
+        return [
+            model_type for model_type in model_types
+            if ArtifactReader.current_version('models', model_type) not in (None, served.get(model_type))
+        ]
+
+    def _publish(self, changes: Dict[str, Any]):
+        """Publish loaded models with a single reference swap"""
+        if not changes:
+            return
+        self.snapshot = self.snapshot.replace(**changes)
+        if 'hotel_ids' in changes:
+            self.hotel_store.invalidate()
+
+    def _start_model_reload(self):
+        """Start polling for artifacts committed by other workers; a non-positive interval disables it"""
+        if self.reload_seconds <= 0 or self._reload_thread is not None:
+            return
+        self._reload_thread = threading.Thread(target=self._reload_loop, name='model-reload', daemon=True)
+        self._reload_thread.start()
+
+    def _reload_loop(self):
+        while not self._reload_stop.wait(self.reload_seconds):
+            try:
+                self.reload_models()
+            except Exception as e:
+                logger.error(f"Failed to reload models: {str(e)}")
+
+    def stop(self):
+        """Stop the popularity, trending and model reload background threads"""
+        self.popularity_table.stop()
+        self.trending_counters.stop()
+        self._reload_stop.set()
@@ -0,0 +1,90 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pymongo
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationStore:
+    """Precomputed top-N hybrid recommendations per user, stored in a Mongo collection.
+
+    Entries hold only hotel ids and score breakdowns, so a read is one indexed
+    find_one plus a cached hotel lookup. An entry is served only within its TTL
+    and while the models that computed it are still serving; ingesting new
+    interactions of a user marks every entry scored before then as stale.
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 86400):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+        try:
+            self.collection.create_index('userId', unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create precomputed recommendations index: {str(e)}")
+
+    def get(self, user_id: str, model_version: str) -> Optional[Dict]:
+        """Fresh precomputed entry for a user, or None on a miss or stale entry"""
+        return self.collection.find_one(self.fresh_query(user_id, model_version))
+
+    def fresh_query(self, user_id: str, model_version: str) -> Dict:
+        """Query matching a user's entry if it is within the TTL, was computed by model_version
+        and was scored after the user's last invalidation"""
+        return {
+            'userId': ObjectId(user_id),
+            'computedAt': {'$gte': datetime.now() - timedelta(seconds=self.ttl_seconds)},
+            'modelVersion': model_version,
+            '$or': [
+                {'invalidatedAt': {'$exists': False}},
+                {'$expr': {'$gt': ['$computedAt', '$invalidatedAt']}}
+            ]
+        }
+
+    def put_many(self, results: List[Dict], model_version: str, computed_at: Optional[datetime] = None):
+        """Store hybrid recommendation results for many users.
+
+        computed_at is when scoring started; results of users invalidated since
+        then are stored but never served.
+        """
+        computed_at = computed_at or datetime.now()
+        operations = [
+            pymongo.UpdateOne(
+                {'userId': ObjectId(result['userId'])},
+                {'$set': {
+                    'recommendations': [
+                        {
+                            'hotelId': rec['hotel']['_id'],
+                            'score': rec['score'],
+                            'content_score': rec['content_score'],
+                            'collab_score': rec['collab_score'],
+                            'reasons': rec['reasons']
+                        }
+                        for rec in result['recommendations']
+                    ],
+                    'computedAt': computed_at,
+                    'modelVersion': model_version
+                }},
+                upsert=True
+            )
+            for result in results
+        ]
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def invalidate(self, user_ids: List[str]):
+        """Mark entries scored until now as stale so the next request scores live.
+
+        The mark outlives the entry, so a precompute that scored these users
+        before the invalidation and writes afterwards doesn't make them fresh again.
+        """
+        invalidated_at = datetime.now()
+        operations = [
+            pymongo.UpdateOne({'userId': ObjectId(user_id)}, {'$set': {'invalidatedAt': invalidated_at}}, upsert=True)
+            for user_id in user_ids if ObjectId.is_valid(str(user_id))
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
@@ -0,0 +1,85 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingCompute:
+    """A computation in flight that other callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """Bounded TTL cache of computed results with stale-while-revalidate refresh.
+
+    Within ttl_seconds an entry is served as is. For a further stale_seconds it
+    is still served, while a single background thread recomputes it. Callers
+    that miss on the same key at the same time share one computation.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, stale_seconds: float = 300, max_size: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached result for key, calling compute() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                if age < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                if age < self.ttl_seconds + self.stale_seconds:
+                    if key not in self._pending:
+                        pending = self._pending[key] = _PendingCompute()
+                        threading.Thread(
+                            target=self._compute, args=(key, compute, pending), daemon=True
+                        ).start()
+                    return entry[1]
+
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _PendingCompute()
+
+        if owner:
+            self._compute(key, compute, pending)
+        else:
+            pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+    def _compute(self, key: Hashable, compute: Callable[[], Any], pending: _PendingCompute):
+        try:
+            pending.value = compute()
+            with self._lock:
+                self._entries[key] = (time.monotonic(), pending.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Error computing cached result for {key}: {str(e)}")
+            pending.error = e
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.done.set()
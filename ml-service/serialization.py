@@ -0,0 +1,61 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+from bson import ObjectId
+from flask.json.provider import JSONProvider
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to JSON bytes; ObjectId, datetime and numpy values are encoded natively"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider that encodes responses with orjson, for the Flask and Quart apps"""
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the base implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+
+def parse_fields(fields: Any) -> Optional[List[str]]:
+    """Hotel fields requested as a list or comma-separated string, or None for all of them"""
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    if not isinstance(fields, list):
+        return None
+
+    fields = [str(field).strip() for field in fields if str(field).strip()]
+    return fields or None
+
+
+def select_hotel_fields(results: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Results with each embedded hotel narrowed to the requested fields and its _id"""
+    if not fields:
+        return results
+
+    keep = ['_id'] + fields
+    selected = []
+    for result in results:
+        # Hotel documents are shared with the cache, so build new ones
+        hotel = result['hotel']
+        selected.append({**result, 'hotel': {field: hotel[field] for field in keep if field in hotel}})
+    return selected
@@ -0,0 +1,100 @@
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+
+logger = logging.getLogger(__name__)
+
+# Peak bytes per (row, hotel) cell of a block: the sparse product (float32 value and
+# int32 index), its dense float32 copy and argpartition's int64 indices
+BLOCK_BYTES_PER_CELL = 8 + 4 + 8
+
+
+class SimilarHotelIndex:
+    """Precomputed table of the top-K most similar hotels for every hotel"""
+
+    def __init__(self, hotel_ids: List[str], neighbors: np.ndarray, scores: np.ndarray):
+        self.hotel_ids = hotel_ids
+        self.hotel_index = {hotel_id: i for i, hotel_id in enumerate(hotel_ids)}
+        self.neighbors = neighbors
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    @classmethod
+    def build(cls, features, hotel_ids: List[str], k: int = 50, memory_mb: float = 256) -> 'SimilarHotelIndex':
+        """Build the neighbour table from hotel feature vectors.
+
+        Cosine similarities are computed in float32, one block of rows at a time,
+        with as many rows per block as fit in memory_mb, so the working set stays
+        within that budget however large the catalogue.
+        """
+        features = normalize(features).astype(np.float32)
+        n_hotels = features.shape[0]
+        k = max(0, min(k, n_hotels - 1))
+        block_size = max(1, int(memory_mb * 1024 * 1024 // (max(n_hotels, 1) * BLOCK_BYTES_PER_CELL)))
+
+        neighbors = np.zeros((n_hotels, k), dtype=np.int32)
+        scores = np.zeros((n_hotels, k), dtype=np.float32)
+
+        for start in range(0, n_hotels, block_size):
+            end = min(start + block_size, n_hotels)
+            similarities = features[start:end].dot(features.T)
+            similarities = similarities.toarray() if hasattr(similarities, 'toarray') else np.asarray(similarities)
+
+            # Exclude each hotel from its own neighbour list
+            rows = np.arange(end - start)
+            similarities[rows, rows + start] = -np.inf
+
+            if k == 0:
+                continue
+
+            # Negate in place so partitioning for the smallest needs no second dense block
+            np.negative(similarities, out=similarities)
+            top = np.argpartition(similarities, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(top_scores, axis=1, kind='stable')
+
+            neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+            scores[start:end] = -np.take_along_axis(top_scores, order, axis=1)
+
+        return cls(list(hotel_ids), neighbors, scores)
+
+    def lookup(self, hotel_id: str, limit: int) -> Optional[List[Tuple[str, float]]]:
+        """Most similar hotels as (hotel_id, score) pairs.
+
+        Returns None if the hotel is unknown or more neighbours were requested
+        than were precomputed, so the caller can fall back to a live computation.
+        """
+        row = self.hotel_index.get(hotel_id)
+        if row is None or limit > self.k:
+            return None
+
+        return [
+            (self.hotel_ids[neighbor], float(score))
+            for neighbor, score in zip(self.neighbors[row, :limit], self.scores[row, :limit])
+        ]
+
+    def save(self, model_dir: str = 'models'):
+        """Persist the neighbour table as a memory-mappable artifact"""
+        writer = ArtifactWriter(model_dir, 'similar_hotels')
+        writer.add_ids('hotel_ids', self.hotel_ids)
+        writer.add_array('neighbors', self.neighbors)
+        writer.add_array('scores', self.scores)
+        writer.commit()
+
+    @classmethod
+    def load(cls, model_dir: str = 'models') -> Optional['SimilarHotelIndex']:
+        """Load the current neighbour table memory-mapped, or None if it does not exist"""
+        reader = ArtifactReader.open(model_dir, 'similar_hotels')
+        return cls.from_reader(reader) if reader is not None else None
+
+    @classmethod
+    def from_reader(cls, reader: ArtifactReader) -> 'SimilarHotelIndex':
+        """Neighbour table from an opened artifact, memory-mapped"""
+        return cls(reader.ids('hotel_ids'), reader.array('neighbors'), reader.array('scores'))
@@ -0,0 +1,130 @@
+"""Fixtures serving the Flask and ASGI apps from an in-process Mongo stand-in.
+
+The synchronous driver is replaced by a mongomock client loaded with a small
+synthetic dataset, and the async driver by a thin asyncio wrapper over the
+same client, so both serving modes read identical data.
+"""
+import os
+import sys
+import asyncio
+from unittest import mock
+
+import pytest
+import mongomock
+import mongomock.collection
+
+ML_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_SERVICE_DIR)
+sys.path.insert(0, os.path.join(ML_SERVICE_DIR, 'benchmarks'))
+
+from synthetic_data import DatasetSpec, SyntheticDataset  # noqa: E402
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, *args, **kwargs):
+        self.cursor = self.cursor.limit(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    """The subset of the async driver's collection API the service uses, counting calls"""
+
+    def __init__(self, collection, calls):
+        self.collection = collection
+        self.calls = calls
+
+    def find(self, *args, **kwargs):
+        self.calls.append(f'{self.collection.name}.find')
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        self.calls.append(f'{self.collection.name}.aggregate')
+        await asyncio.sleep(0)
+        return AsyncCursor(self.collection.aggregate(*args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        self.calls.append(f'{self.collection.name}.find_one')
+        await asyncio.sleep(0)
+        return self.collection.find_one(*args, **kwargs)
+
+
+class AsyncDatabase:
+    def __init__(self, database, calls):
+        self.database = database
+        self.calls = calls
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.database[name], self.calls)
+
+
+class AsyncMongomockClient:
+    """Stand-in for pymongo.AsyncMongoClient backed by a mongomock client"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def get_default_database(self):
+        return AsyncDatabase(self.client.get_default_database(), self.calls)
+
+    async def close(self):
+        pass
+
+
+def _add_update(self, *args, sort=None, **kwargs):
+    # pymongo 4.9+ passes a sort option with update operations, which mongomock 4.3 doesn't accept
+    return _original_add_update(self, *args, **kwargs)
+
+
+_original_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+
+@pytest.fixture
+def bulk_update(monkeypatch):
+    """Let mongomock accept the update operations pymongo builds for bulk_write"""
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, 'add_update', _add_update)
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    return SyntheticDataset(DatasetSpec(hotels=80, users=40, interactions=2000, seed=7))
+
+
+@pytest.fixture(scope='session')
+def services(tmp_path_factory, dataset):
+    """(Flask app, Quart app, async Mongo stand-in) over one trained engine"""
+    client = mongomock.MongoClient('mongodb://localhost:27017/booking-app')
+    dataset.load(client.get_default_database())
+    async_client = AsyncMongomockClient(client)
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('service'))
+    patches = [
+        mock.patch.dict(os.environ, {'MODEL_STARTUP_MODE': 'blocking', 'METRICS_ENABLED': 'true'}),
+        mock.patch('pymongo.MongoClient', return_value=client),
+        mock.patch('pymongo.AsyncMongoClient', return_value=async_client),
+        mock.patch.object(mongomock.collection.BulkOperationBuilder, 'add_update', _add_update)
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        import asgi_app
+        asgi_app.rec_engine.popularity_table.loaded.wait(30)
+        asgi_app.rec_engine.trending_counters.loaded.wait(30)
+        yield asgi_app.flask_app, asgi_app.async_app, async_client
+        asgi_app.rec_engine.stop()
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+        os.chdir(cwd)
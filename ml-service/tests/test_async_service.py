@@ -0,0 +1,132 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+
+def call_async_app(async_app, method, path, **kwargs):
+    """Status and body of one request served by the Quart app, with its services started"""
+    async def request():
+        async with async_app.test_app() as test_app:
+            response = await test_app.test_client().open(path, method=method, **kwargs)
+            return response.status_code, await response.get_data()
+    return asyncio.run(request())
+
+
+def call_flask_app(flask_app, method, path, **kwargs):
+    response = flask_app.test_client().open(path, method=method, **kwargs)
+    # Closing the response runs its close callbacks, as a WSGI server does once the body is sent
+    with response:
+        return response.status_code, response.get_data()
+
+
+def assert_same_response(services, method, path, **kwargs):
+    flask_app, async_app, _ = services
+    flask_status, flask_body = call_flask_app(flask_app, method, path, **kwargs)
+    async_status, async_body = call_async_app(async_app, method, path, **kwargs)
+
+    assert flask_status == async_status == 200
+    assert json.loads(async_body) == json.loads(flask_body)
+    return json.loads(flask_body)
+
+
+@pytest.mark.parametrize('user_index', [0, 1, 5, 17])
+def test_personalized_matches_flask(services, dataset, user_index):
+    body = assert_same_response(services, 'POST', '/recommendations/personalized', json={
+        'userId': str(dataset.user_ids[user_index]), 'limit': 5
+    })
+    assert body['total'] > 0
+
+
+def satisfies(hotel, filters):
+    price_range = filters.get('priceRange', {})
+    return (
+        ('city' not in filters or hotel['city'].lower() == filters['city'].lower())
+        and hotel['cheapestPrice'] >= price_range.get('min', 0)
+        and hotel['cheapestPrice'] <= price_range.get('max', float('inf'))
+        and hotel['rating'] >= filters.get('minRating', 0)
+        and ('type' not in filters or hotel['type'].lower() == filters['type'].lower())
+        and set(filters.get('amenities', [])) <= set(hotel['amenities'])
+    )
+
+
+@pytest.mark.parametrize('filters', [
+    {'city': 'goa'},
+    {'priceRange': {'min': 100, 'max': 250}},
+    {'amenities': ['wifi', 'pool']},
+    {'type': 'Resort', 'minRating': 3}
+])
+def test_personalized_with_filters_matches_flask(services, dataset, filters):
+    _, _, async_client = services
+    hotels = {str(hotel['_id']): hotel for hotel in async_client.client.get_default_database().hotels.find()}
+    eligible = [hotel_id for hotel_id, hotel in hotels.items() if satisfies(hotel, filters)]
+    assert eligible
+
+    body = assert_same_response(services, 'POST', '/recommendations/personalized', json={
+        'userId': str(dataset.user_ids[2]), 'limit': 5, 'filters': filters, 'fields': 'name,city'
+    })
+
+    assert body['total'] == min(5, len(eligible))
+    for rec in body['recommendations']:
+        assert satisfies(hotels[rec['hotel']['_id']], filters)
+
+
+def test_batch_matches_flask(services, dataset):
+    flask_app, async_app, _ = services
+    payload = {'userIds': [str(user_id) for user_id in dataset.user_ids[:12]] + ['not-an-id'], 'limit': 4}
+
+    flask_status, flask_body = call_flask_app(flask_app, 'POST', '/recommendations/personalized/batch', json=payload)
+    async_status, async_body = call_async_app(async_app, 'POST', '/recommendations/personalized/batch', json=payload)
+
+    assert flask_status == async_status == 200
+    flask_lines = [json.loads(line) for line in flask_body.splitlines()]
+    async_lines = [json.loads(line) for line in async_body.splitlines()]
+    assert async_lines == flask_lines
+    assert len(flask_lines) == len(payload['userIds'])
+
+
+@pytest.mark.parametrize('hotel_index', [0, 3, 42])
+def test_similar_matches_flask(services, dataset, hotel_index):
+    body = assert_same_response(services, 'POST', '/recommendations/similar', json={
+        'hotelId': str(dataset.hotel_ids[hotel_index]), 'limit': 5
+    })
+    assert body['total'] > 0
+
+
+def test_trending_matches_flask(services):
+    assert_same_response(services, 'GET', '/recommendations/trending?limit=5')
+
+
+def test_precomputed_hit_matches_flask_without_profile_queries(services, dataset):
+    flask_app, async_app, async_client = services
+    status, _ = call_flask_app(flask_app, 'POST', '/recommendations/precompute')
+    assert status == 202
+    # Jobs run in the background; poll until the precompute job is done
+    for _ in range(200):
+        jobs = json.loads(call_flask_app(flask_app, 'GET', '/models/status')[1])['jobs']
+        if all(job['status'] in ('succeeded', 'failed') for job in jobs):
+            break
+        asyncio.run(asyncio.sleep(0.05))
+
+    from app import rec_engine
+    user_id = str(dataset.user_ids[3])
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is not None
+    # A cached profile would also avoid the profile queries
+    rec_engine.user_profiles.invalidate()
+    del async_client.calls[:]
+    body = assert_same_response(services, 'POST', '/recommendations/personalized', json={'userId': user_id, 'limit': 5})
+
+    assert body['total'] > 0
+    assert 'precomputedrecommendations.find_one' in async_client.calls
+    assert not any(call.startswith(('userinteractions', 'userpreferences')) for call in async_client.calls)
+
+
+def test_first_async_request_starts_deferred_retrain(services, dataset):
+    _, async_app, _ = services
+    from app import jobs, rec_engine
+    with mock.patch.object(rec_engine, 'stale_models', ['content']), mock.patch.object(jobs, 'submit') as submit:
+        call_async_app(async_app, 'POST', '/recommendations/similar', json={'hotelId': str(dataset.hotel_ids[0])})
+        call_async_app(async_app, 'POST', '/recommendations/similar', json={'hotelId': str(dataset.hotel_ids[1])})
+
+    submit.assert_called_once_with('retrain', rec_engine.retrain_models, model_type='content', stale_only=True)
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+
+from model_artifacts import ArtifactReader, ArtifactWriter
+
+
+def write_version(model_dir, keep_versions=2):
+    writer = ArtifactWriter(str(model_dir), 'content', keep_versions=keep_versions)
+    writer.add_array('values', np.arange(3))
+    writer.commit()
+    return writer.version
+
+
+def test_prune_keeps_current_and_uncommitted_versions(tmp_path):
+    committed = [write_version(tmp_path) for _ in range(2)]
+    # Another writer has started a newer version but not committed it yet
+    in_progress = ArtifactWriter(str(tmp_path), 'content')
+
+    current = write_version(tmp_path, keep_versions=1)
+
+    versions = set(os.listdir(os.path.join(tmp_path, 'content')))
+    assert in_progress.version in versions
+    assert current in versions
+    assert not versions & set(committed)
+    assert ArtifactReader.current_version(str(tmp_path), 'content') == current
+
+def test_prune_keeps_newest_committed_versions(tmp_path):
+    versions = [write_version(tmp_path) for _ in range(4)]
+
+    remaining = {entry for entry in os.listdir(os.path.join(tmp_path, 'content')) if entry in versions}
+    assert remaining == set(versions[-2:])
+    assert ArtifactReader.open(str(tmp_path), 'content').version == versions[-1]
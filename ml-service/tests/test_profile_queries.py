@@ -0,0 +1,52 @@
+from bson import ObjectId
+
+from recommendation_engine import PROFILE_INTERACTIONS, RecommendationEngine
+
+
+def newest_interactions(collection, interactions_query, user_id):
+    """A user's newest interactions within the query's time range, read one user at a time"""
+    since = interactions_query['createdAt']
+    cursor = collection.find({'userId': ObjectId(user_id), 'createdAt': since}).sort('createdAt', -1)
+    return [(str(row['hotelId']), row['interactionType']) for row in cursor.limit(PROFILE_INTERACTIONS)]
+
+
+def test_profile_pipeline_caps_interactions_per_user(services, dataset):
+    from app import rec_engine
+    collection = rec_engine.db.userinteractions
+    user_ids = [str(user_id) for user_id in dataset.user_ids]
+    _, interactions_query, pipeline = RecommendationEngine._profile_queries(user_ids)
+    assert any(
+        len(newest_interactions(collection, interactions_query, user_id)) == PROFILE_INTERACTIONS for user_id in user_ids
+    )
+    fetched = {user_id: [] for user_id in user_ids}
+    for row in collection.aggregate(pipeline):
+        fetched[str(row['userId'])].append((str(row['hotelId']), row['interactionType']))
+
+    for user_id in user_ids:
+        assert fetched[user_id] == newest_interactions(collection, interactions_query, user_id)
+
+
+def test_single_user_profile_reads_are_limited(services, dataset, monkeypatch):
+    from app import rec_engine
+    collection = rec_engine.db.userinteractions
+    user_id = next(
+        str(user_id) for user_id in dataset.user_ids
+        if collection.count_documents({'userId': user_id}) > PROFILE_INTERACTIONS
+    )
+    _, interactions_query, pipeline = RecommendationEngine._profile_queries([user_id])
+    assert pipeline is None
+    assert len(newest_interactions(collection, interactions_query, user_id)) == PROFILE_INTERACTIONS
+
+    built = []
+    build_user_profiles = rec_engine._build_user_profiles
+
+    def recording_build_user_profiles(snapshot, user_ids, preferences, interactions):
+        interactions = list(interactions)
+        built.append(len(interactions))
+        return build_user_profiles(snapshot, user_ids, preferences, interactions)
+
+    monkeypatch.setattr(rec_engine, '_build_user_profiles', recording_build_user_profiles)
+    rec_engine.user_profiles.invalidate()
+    rec_engine._get_user_profiles(rec_engine.snapshot, [user_id])
+
+    assert built == [PROFILE_INTERACTIONS]
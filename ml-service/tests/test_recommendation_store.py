@@ -0,0 +1,74 @@
+import json
+from datetime import datetime
+
+from test_async_service import call_async_app, call_flask_app
+
+
+def store_entry(dataset, user_index, model_version, computed_at=None):
+    from app import rec_engine
+    user_id = str(dataset.user_ids[user_index])
+    rec_engine.recommendation_store.put_many([{
+        'userId': user_id,
+        'recommendations': [{
+            'hotel': {'_id': dataset.hotel_ids[0]},
+            'score': 1.0,
+            'content_score': 1.0,
+            'collab_score': 0.0,
+            'reasons': ['precomputed']
+        }]
+    }], model_version, computed_at)
+    return user_id
+
+
+def personalized_reasons(call, app, user_id):
+    status, body = call(app, 'POST', '/recommendations/personalized', json={'userId': user_id, 'limit': 5})
+    assert status == 200
+    return [rec.get('reasons') for rec in json.loads(body)['recommendations']]
+
+
+def test_entries_from_other_model_versions_are_stale(services, dataset):
+    flask_app, async_app, _ = services
+    from app import rec_engine
+    user_id = store_entry(dataset, 7, 'retired-version')
+
+    assert rec_engine.recommendation_store.get(user_id, 'retired-version') is not None
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is None
+    assert ['precomputed'] not in personalized_reasons(call_flask_app, flask_app, user_id)
+    assert ['precomputed'] not in personalized_reasons(call_async_app, async_app, user_id)
+
+
+def test_ingested_interactions_invalidate_entries(services, dataset):
+    flask_app, _, _ = services
+    from app import rec_engine
+    user_id = store_entry(dataset, 8, rec_engine.model_version)
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is not None
+
+    status, _ = call_flask_app(flask_app, 'POST', '/interactions/ingest', json={'events': [
+        {'userId': user_id, 'hotelId': str(dataset.hotel_ids[1]), 'interactionType': 'view'}
+    ]})
+
+    assert status == 200
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is None
+
+
+def test_entries_scored_before_an_ingest_stay_stale(services, dataset):
+    flask_app, async_app, _ = services
+    from app import rec_engine
+    scored_at = datetime.now()
+
+    # Interactions arrive after the user was scored but before the precompute writes the entry
+    user_id = str(dataset.user_ids[9])
+    status, _ = call_flask_app(flask_app, 'POST', '/interactions/ingest', json={'events': [
+        {'userId': user_id, 'hotelId': str(dataset.hotel_ids[1]), 'interactionType': 'view'}
+    ]})
+    assert status == 200
+    store_entry(dataset, 9, rec_engine.model_version, scored_at)
+
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is None
+    assert ['precomputed'] not in personalized_reasons(call_flask_app, flask_app, user_id)
+    assert ['precomputed'] not in personalized_reasons(call_async_app, async_app, user_id)
+
+    # Scoring after the ingest makes the entry fresh again
+    store_entry(dataset, 9, rec_engine.model_version)
+    assert rec_engine.recommendation_store.get(user_id, rec_engine.model_version) is not None
+    assert ['precomputed'] in personalized_reasons(call_async_app, async_app, user_id)
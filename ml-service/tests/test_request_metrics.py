@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+import metrics
+from test_async_service import call_async_app, call_flask_app
+
+BATCH_ENDPOINT = 'get_batch_personalized_recommendations'
+
+
+def recorded_seconds(endpoint):
+    entry = metrics.REQUEST_SECONDS._values.get((endpoint,))
+    return (entry[1], entry[2]) if entry else (0.0, 0)
+
+
+@pytest.mark.parametrize('call', [call_flask_app, call_async_app])
+def test_streamed_batch_duration_covers_the_body(services, dataset, monkeypatch, call):
+    flask_app, async_app, _ = services
+    app = flask_app if call is call_flask_app else async_app
+    from app import rec_engine
+
+    build_user_profiles = rec_engine._build_user_profiles
+
+    def slow_build_user_profiles(*args, **kwargs):
+        time.sleep(0.2)
+        return build_user_profiles(*args, **kwargs)
+
+    # Profiles are built while the body streams, after the after_request hooks have run
+    monkeypatch.setattr(rec_engine, '_build_user_profiles', slow_build_user_profiles)
+    rec_engine.user_profiles.invalidate()
+    rec_engine.recommendation_store.invalidate(str(user_id) for user_id in dataset.user_ids[:3])
+    seconds_before, count_before = recorded_seconds(BATCH_ENDPOINT)
+
+    status, _ = call(app, 'POST', '/recommendations/personalized/batch', json={
+        'userIds': [str(user_id) for user_id in dataset.user_ids[:3]], 'limit': 3
+    })
+
+    seconds_after, count_after = recorded_seconds(BATCH_ENDPOINT)
+    assert status == 200
+    assert count_after == count_before + 1
+    assert seconds_after - seconds_before >= 0.2
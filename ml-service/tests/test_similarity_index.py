@@ -0,0 +1,25 @@
+import numpy as np
+import scipy.sparse as sp
+
+from similarity_index import SimilarHotelIndex
+
+
+def test_memory_budget_does_not_change_neighbors():
+    rng = np.random.default_rng(3)
+    features = sp.random(300, 40, density=0.2, random_state=rng, format='csr')
+    hotel_ids = [f'h{i}' for i in range(300)]
+
+    one_row_blocks = SimilarHotelIndex.build(features, hotel_ids, k=10, memory_mb=0)
+    single_block = SimilarHotelIndex.build(features, hotel_ids, k=10, memory_mb=64)
+
+    dense = features.toarray()
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    dense = dense / np.where(norms == 0, 1, norms)
+    expected = dense @ dense.T
+    np.fill_diagonal(expected, -np.inf)
+    expected_scores = -np.sort(-expected, axis=1)[:, :10]
+
+    for index in (one_row_blocks, single_block):
+        assert index.scores.dtype == np.float32
+        np.testing.assert_allclose(index.scores, expected_scores, atol=1e-5)
+    np.testing.assert_array_equal(one_row_blocks.neighbors, single_block.neighbors)
@@ -0,0 +1,49 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+
+from trending_counters import TrendingCounters
+
+
+@pytest.fixture
+def local_timezone():
+    """Run with a local time zone ahead of UTC, where mixing local and UTC times loses recent events"""
+    original = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Kolkata'
+    time.tzset()
+    yield
+    if original is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = original
+    time.tzset()
+
+
+def test_rebuild_and_ingest_agree_on_recent_events(local_timezone):
+    collection = mongomock.MongoClient().db.userinteractions
+    # pymongo returns stored dates as naive UTC datetimes
+    created_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=5)
+    collection.insert_one({'hotelId': 'h1', 'userId': 'u1', 'createdAt': created_at})
+
+    rebuilt = TrendingCounters(collection, window_seconds=3 * 3600, bucket_seconds=600)
+    rebuilt.rebuild()
+
+    ingested = TrendingCounters(None, window_seconds=3 * 3600, bucket_seconds=600)
+    timestamp = datetime.fromisoformat(created_at.isoformat() + '+00:00').timestamp()
+    assert ingested.add([('h1', 'u1', timestamp)]) == 1
+
+    assert rebuilt.top_hotels(5) == ingested.top_hotels(5)
+    assert rebuilt.top_hotels(5)[0]['interaction_count'] == 1
+
+
+def test_counts_expire_with_the_window():
+    counters = TrendingCounters(None, window_seconds=3600, bucket_seconds=600)
+    now = time.time()
+    counters.add([('h1', 'u1', now - 3000), ('h1', 'u2', now - 100), ('h2', 'u1', now - 3500)])
+    assert [(row['_id'], row['interaction_count']) for row in counters.top_hotels(5)] == [('h1', 2), ('h2', 1)]
+
+    counters._expire_locked(now + 1200)
+    assert [(row['_id'], row['interaction_count']) for row in counters.top_hotels(5)] == [('h1', 1)]
@@ -0,0 +1,110 @@
+from unittest import mock
+
+import mongomock
+import mongomock.collection
+import pytest
+from bson import ObjectId
+from pymongo.errors import ServerSelectionTimeoutError
+
+from model_artifacts import ArtifactReader
+
+
+@pytest.fixture
+def trained_models(tmp_path, monkeypatch, dataset, bulk_update):
+    """A Mongo stand-in with the synthetic dataset and models persisted under tmp_path/models"""
+    client = mongomock.MongoClient('mongodb://localhost:27017/booking-app')
+    dataset.load(client.get_default_database())
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MODEL_STARTUP_MODE', 'blocking')
+
+    from recommendation_engine import RecommendationEngine
+    with mock.patch('pymongo.MongoClient', return_value=client):
+        engine = RecommendationEngine()
+    engine.stop()
+    assert engine.snapshot.has_content_model
+
+    monkeypatch.setenv('MODEL_STARTUP_MODE', 'background')
+    return client
+
+
+def start_engine(client):
+    from recommendation_engine import RecommendationEngine
+    with mock.patch('pymongo.MongoClient', return_value=client):
+        engine = RecommendationEngine()
+    engine.popularity_table.loaded.wait(10)
+    engine.trending_counters.loaded.wait(10)
+    engine.stop()
+    return engine
+
+
+def test_warm_start_serves_when_popularity_refresh_fails(trained_models):
+    with mock.patch.object(mongomock.collection.Collection, 'aggregate',
+                           side_effect=ServerSelectionTimeoutError('unreachable')):
+        engine = start_engine(trained_models)
+
+    assert engine.ready
+    assert engine.snapshot.has_content_model
+    assert engine.stale_models == []
+
+
+def test_warm_start_retrains_everything_when_staleness_check_fails(trained_models):
+    with mock.patch.object(mongomock.collection.Collection, 'estimated_document_count',
+                           side_effect=ServerSelectionTimeoutError('unreachable')):
+        engine = start_engine(trained_models)
+
+    assert engine.ready
+    assert engine.snapshot.has_content_model
+    assert engine.claim_stale_models() == ['content', 'collaborative']
+
+
+def test_retrain_publishes_memory_mapped_artifacts(trained_models):
+    engine = start_engine(trained_models)
+
+    results = engine.retrain_models('all')
+
+    assert results['content_model'] == 'retrained successfully'
+    snapshot = engine.snapshot
+    assert snapshot.artifact_versions['content'] == ArtifactReader.current_version('models', 'content')
+    # Arrays mapped read-only from the artifact, not the writable ones training built
+    assert not snapshot.hotel_features_matrix.data.flags.writeable
+
+
+def test_stale_only_retrain_skips_models_another_worker_refreshed(trained_models):
+    engine = start_engine(trained_models)
+    version = engine.snapshot.artifact_versions['content']
+
+    results = engine.retrain_models('content', stale_only=True)
+
+    assert results['content_model'] == 'already up to date'
+    assert ArtifactReader.current_version('models', 'content') == version
+
+
+def test_worker_reloads_artifacts_committed_by_another(trained_models):
+    engine = start_engine(trained_models)
+    other = start_engine(trained_models)
+
+    other.retrain_models('all')
+    assert engine.snapshot.artifact_versions != other.snapshot.artifact_versions
+
+    assert engine.reload_models()
+    assert engine.snapshot.artifact_versions == other.snapshot.artifact_versions
+    assert not engine.reload_models()
+
+
+def test_workers_over_the_same_artifacts_share_precomputed_entries(trained_models, dataset):
+    engine = start_engine(trained_models)
+    other = start_engine(trained_models)
+    assert engine.model_version == other.model_version
+
+    result = engine.precompute_recommendations()
+    assert result['stored'] > 0
+
+    user_id = str(dataset.user_ids[0])
+    # Mark the stored entry so serving it can't be mistaken for live scoring
+    collection = engine.recommendation_store.collection
+    entry = collection.find_one({'userId': ObjectId(user_id)})
+    recommendations = [{**rec, 'reasons': ['precomputed']} for rec in entry['recommendations']]
+    collection.update_one({'_id': entry['_id']}, {'$set': {'recommendations': recommendations}})
+
+    served = other.get_personalized_recommendations(user_id, 5)
+    assert served and all(rec['reasons'] == ['precomputed'] for rec in served)
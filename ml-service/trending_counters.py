@@ -0,0 +1,256 @@
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def utc_timestamp(value: datetime) -> float:
+    """POSIX timestamp of a datetime, reading naive values as UTC like pymongo stores them"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _hll_estimate(registers: np.ndarray) -> float:
+    """HyperLogLog (Flajolet et al. 2007) distinct count estimate from one set of registers"""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(float)))
+
+    # Linear counting is more accurate while many registers are still empty
+    empty = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and empty:
+        return m * np.log(m / empty)
+    return raw
+
+
+class TrendingCounters:
+    """Sliding-window interaction counters per hotel, kept in memory.
+
+    Hotels are numbered in order of first appearance. Each fixed-width time
+    bucket holds one array of interaction counts indexed by hotel, and distinct
+    users are tracked in coarser sketch buckets, each one matrix of HyperLogLog
+    registers with a row per hotel. Memory is bounded by hotels times buckets,
+    whatever the event volume. Buckets that fall out of the window are dropped
+    and their counts subtracted from running totals, so ranking only merges
+    sketches for the few hotels that can still make the top list. Unique users
+    are counted over the window rounded out to whole sketch buckets. A rebuild
+    from userinteractions on the background thread recovers the window after
+    a restart and then repeats periodically.
+    """
+
+    def __init__(self, collection, window_seconds: float = 7 * 86400, bucket_seconds: float = 3600,
+                 precision: int = 7, sketch_buckets: int = 7, rebuild_seconds: float = 3600,
+                 batch_size: int = 10000):
+        self.collection = collection
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.precision = precision
+        self.sketch_buckets = sketch_buckets
+        self.sketch_seconds = max(bucket_seconds, window_seconds / max(sketch_buckets, 1))
+        self.rebuild_seconds = rebuild_seconds
+        self.batch_size = batch_size
+        self._reset()
+        self._replay = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Set once the first background rebuild has finished or failed
+        self.loaded = threading.Event()
+
+    def _reset(self):
+        self._rows = {}
+        self._hotel_ids = []
+        self._capacity = 0
+        self._totals = np.zeros(0, dtype=np.int64)
+        self._buckets = OrderedDict()
+        self._sketches = OrderedDict()
+
+    def add(self, events: Iterable[Tuple[str, Optional[str], float]]) -> int:
+        """Count (hotel_id, user_id, timestamp) events, returning how many fell inside the window"""
+        events = list(events)
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(events)
+            return self._add_locked(events, time.time())
+
+    def top_hotels(self, limit: int) -> List[Dict]:
+        """Hotels with the highest trending score over the window, best first"""
+        with self._lock:
+            self._expire_locked(time.time())
+            totals = self._totals
+            active = np.flatnonzero(totals)
+            by_count = active[np.argsort(-totals[active], kind='stable')]
+            sketches = list(self._sketches.values())
+
+            ranked = []
+            for row in by_count:
+                count = int(totals[row])
+                # Unique users never exceed interactions, so count bounds the score
+                if len(ranked) >= limit and count <= ranked[limit - 1][0]:
+                    break
+
+                registers = np.max([sketch[row] for sketch in sketches], axis=0) if sketches else None
+                unique_users = int(round(_hll_estimate(registers))) if registers is not None else 0
+                unique_users = max(1, min(unique_users, count))
+                score = count * 0.6 + unique_users * 0.4
+                ranked.append((score, self._hotel_ids[row], count, unique_users))
+                ranked.sort(key=lambda entry: entry[0], reverse=True)
+
+        return [
+            {
+                '_id': hotel_id,
+                'trending_score': score,
+                'interaction_count': count,
+                'unique_user_count': unique_users
+            }
+            for score, hotel_id, count, unique_users in ranked[:limit]
+        ]
+
+    def rebuild(self):
+        """Replace the counters with the window recounted from userinteractions"""
+        with self._lock:
+            self._replay = []
+
+        try:
+            cutoff = time.time()
+            # pymongo stores and returns naive datetimes in UTC
+            since = datetime.fromtimestamp(cutoff - self.window_seconds, timezone.utc).replace(tzinfo=None)
+            cursor = self.collection.find(
+                {'createdAt': {'$gte': since}},
+                {'_id': 0, 'hotelId': 1, 'userId': 1, 'createdAt': 1}
+            ).batch_size(self.batch_size)
+
+            fresh = TrendingCounters(None, self.window_seconds, self.bucket_seconds, self.precision, self.sketch_buckets)
+            rows = ((row['hotelId'], row.get('userId'), utc_timestamp(row['createdAt'])) for row in cursor if row.get('hotelId'))
+            while True:
+                batch = [event for _, event in zip(range(self.batch_size), rows)]
+                if not batch:
+                    break
+                fresh._add_locked(batch, time.time())
+
+            # Events pushed while the rebuild ran are not in the query results if they are newer than it
+            with self._lock:
+                fresh._add_locked([event for event in self._replay if event[2] > cutoff], time.time())
+                self._rows, self._hotel_ids, self._capacity = fresh._rows, fresh._hotel_ids, fresh._capacity
+                self._totals, self._buckets, self._sketches = fresh._totals, fresh._buckets, fresh._sketches
+        finally:
+            with self._lock:
+                self._replay = None
+
+        logger.info(f"Rebuilt trending counters for {int(np.count_nonzero(self._totals))} hotels")
+
+    def start(self):
+        """Start rebuilding the counters from the database in the background, beginning right away"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._rebuild_loop, name='trending-rebuild', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background rebuild"""
+        self._stop_event.set()
+
+    def _rebuild_loop(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Failed to rebuild trending counters: {str(e)}")
+            self.loaded.set()
+
+            # A non-positive interval rebuilds once at startup only
+            if self.rebuild_seconds <= 0 or self._stop_event.wait(self.rebuild_seconds):
+                return
+
+    def _add_locked(self, events: List[Tuple[str, Optional[str], float]], now: float) -> int:
+        self._expire_locked(now)
+        oldest = now - self.window_seconds
+        register_bits = 64 - self.precision
+
+        bucket_rows = {}
+        sketch_updates = {}
+        for hotel_id, user_id, timestamp in events:
+            if timestamp < oldest or timestamp > now + self.bucket_seconds:
+                continue
+
+            hotel_id = str(hotel_id)
+            row = self._rows.get(hotel_id)
+            if row is None:
+                row = self._rows[hotel_id] = len(self._hotel_ids)
+                self._hotel_ids.append(hotel_id)
+            bucket_rows.setdefault(int(timestamp // self.bucket_seconds), []).append(row)
+
+            if user_id is not None:
+                hashed = int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), 'big')
+                remainder = hashed & ((1 << register_bits) - 1)
+                updates = sketch_updates.setdefault(int(timestamp // self.sketch_seconds), ([], [], []))
+                updates[0].append(row)
+                updates[1].append(hashed >> register_bits)
+                updates[2].append(register_bits - remainder.bit_length() + 1)
+
+        if not bucket_rows:
+            return 0
+        self._grow_locked(len(self._hotel_ids))
+
+        added = 0
+        for bucket_key, rows in bucket_rows.items():
+            counts = self._buckets.get(bucket_key)
+            if counts is None:
+                counts = self._buckets[bucket_key] = np.zeros(self._capacity, dtype=np.uint32)
+                self._sort_locked(self._buckets)
+            rows = np.asarray(rows, dtype=np.intp)
+            np.add.at(counts, rows, 1)
+            np.add.at(self._totals, rows, 1)
+            added += len(rows)
+
+        for sketch_key, (rows, registers, ranks) in sketch_updates.items():
+            sketch = self._sketches.get(sketch_key)
+            if sketch is None:
+                sketch = self._sketches[sketch_key] = np.zeros((self._capacity, 1 << self.precision), dtype=np.uint8)
+                self._sort_locked(self._sketches)
+            np.maximum.at(sketch, (np.asarray(rows, dtype=np.intp), np.asarray(registers, dtype=np.intp)),
+                          np.asarray(ranks, dtype=np.uint8))
+
+        return added
+
+    def _grow_locked(self, hotels: int):
+        """Widen every per-hotel array to fit at least this many hotels"""
+        if hotels <= self._capacity:
+            return
+        capacity = max(hotels, self._capacity + self._capacity // 4, 1024)
+        extra = capacity - self._capacity
+
+        self._totals = np.concatenate([self._totals, np.zeros(extra, dtype=self._totals.dtype)])
+        for bucket_key, counts in self._buckets.items():
+            self._buckets[bucket_key] = np.concatenate([counts, np.zeros(extra, dtype=counts.dtype)])
+        for sketch_key, sketch in self._sketches.items():
+            self._sketches[sketch_key] = np.concatenate([sketch, np.zeros((extra, sketch.shape[1]), dtype=sketch.dtype)])
+        self._capacity = capacity
+
+    @staticmethod
+    def _sort_locked(buckets: OrderedDict):
+        # Late events can open a bucket older than the newest; keep buckets in time order for expiry
+        if len(buckets) > 1 and next(reversed(buckets)) < max(buckets):
+            items = sorted(buckets.items())
+            buckets.clear()
+            buckets.update(items)
+
+    def _expire_locked(self, now: float):
+        oldest_key = int((now - self.window_seconds) // self.bucket_seconds)
+        while self._buckets:
+            bucket_key = next(iter(self._buckets))
+            if bucket_key >= oldest_key:
+                break
+            self._totals -= self._buckets.pop(bucket_key)
+
+        oldest_sketch = int((now - self.window_seconds) // self.sketch_seconds)
+        while self._sketches and next(iter(self._sketches)) < oldest_sketch:
+            self._sketches.popitem(last=False)
@@ -0,0 +1,147 @@
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BehaviorSummary:
+    """Behavior counts over one user's most recent interactions, plus their recent bookings.
+
+    Interactions enter as the newest of a fixed-size window and the oldest
+    falls out, so each update is O(1). Counts keep their keys in order of
+    most recent occurrence, which breaks ties between equally frequent cities
+    or types in favor of the one seen last.
+    """
+
+    def __init__(self, window_size: int = 100):
+        self.window_size = window_size
+        self.window = deque()
+        self.cities = OrderedDict()
+        self.types = OrderedDict()
+        self.interaction_types = OrderedDict()
+        # Recent bookings, newest first; None until loaded or after a new booking
+        self.bookings = None
+
+    def add(self, city: Optional[str], hotel_type: Optional[str], interaction_type: str):
+        """Count an interaction as the newest, dropping the oldest beyond the window"""
+        self.window.append((city, hotel_type, interaction_type))
+        self._increment(self.cities, city)
+        self._increment(self.types, hotel_type)
+        self._increment(self.interaction_types, interaction_type)
+
+        if len(self.window) > self.window_size:
+            city, hotel_type, interaction_type = self.window.popleft()
+            self._decrement(self.cities, city)
+            self._decrement(self.types, hotel_type)
+            self._decrement(self.interaction_types, interaction_type)
+
+    def describe(self) -> Dict:
+        """Behavior patterns and booking stats, as in a user profile analysis"""
+        patterns = {}
+        if self.window:
+            patterns = {
+                'most_viewed_cities': self._most_common(self.cities, 5),
+                'preferred_hotel_types': self._most_common(self.types, 3),
+                'interaction_distribution': dict(reversed(self.interaction_types.items())),
+                'total_interactions': len(self.window)
+            }
+        return {
+            'behavior_patterns': patterns,
+            'booking_stats': self._booking_stats(),
+            'bookings_loaded': self.bookings is not None
+        }
+
+    def _booking_stats(self) -> Optional[Dict]:
+        if not self.bookings:
+            return None
+
+        rated = [booking['rating'] for booking in self.bookings if booking['rating'] > 0]
+        recent_since = datetime.now() - timedelta(days=90)
+        return {
+            'total_bookings': len(self.bookings),
+            'total_spent': sum(booking['totalAmount'] for booking in self.bookings),
+            'average_rating_given': sum(rated) / max(len(rated), 1),
+            'recent_bookings': len([b for b in self.bookings if b['createdAt'] > recent_since])
+        }
+
+    @staticmethod
+    def _increment(counts: OrderedDict, key: Optional[str]):
+        if key is None:
+            return
+        counts[key] = counts.get(key, 0) + 1
+        counts.move_to_end(key)
+
+    @staticmethod
+    def _decrement(counts: OrderedDict, key: Optional[str]):
+        if key is None:
+            return
+        counts[key] -= 1
+        if counts[key] == 0:
+            del counts[key]
+
+    @staticmethod
+    def _most_common(counts: OrderedDict, n: int) -> List:
+        # Most recent first, so the stable sort keeps recency order among ties
+        return sorted(reversed(counts.items()), key=lambda x: x[1], reverse=True)[:n]
+
+
+class UserBehaviorSummaries:
+    """Bounded LRU of per-user behavior summaries, kept current by ingested interactions.
+
+    A summary is built from MongoDB on a user's first analysis and afterwards
+    only updated from the interaction stream. Entries expire after a TTL, which
+    bounds the drift from events the stream dropped.
+    """
+
+    def __init__(self, window_size: int = 100, max_size: int = 10000, ttl_seconds: float = 3600):
+        self.window_size = window_size
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def describe(self, user_id: str) -> Optional[Dict]:
+        """A user's summary description, or None if there is no live summary"""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None or time.monotonic() - entry[0] >= self.ttl_seconds:
+                return None
+            self._cache.move_to_end(user_id)
+            return entry[1].describe()
+
+    def put(self, user_id: str, summary: BehaviorSummary):
+        with self._lock:
+            self._cache[user_id] = (time.monotonic(), summary)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def tracked(self, user_ids) -> set:
+        """The users among user_ids that have a summary to update"""
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._cache}
+
+    def set_bookings(self, user_id: str, bookings: List[Dict]):
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                entry[1].bookings = bookings
+
+    def record(self, user_id: str, hotel: Optional[Dict], interaction_type: str):
+        """Add a new interaction to a user's summary, if there is one"""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                return
+            summary = entry[1]
+            if hotel:
+                summary.add(hotel.get('city', 'Unknown'), hotel.get('type', 'Unknown'), interaction_type)
+            else:
+                summary.add(None, None, interaction_type)
+            if interaction_type == 'booking':
+                # Booking amounts and ratings aren't in the event; reload them on the next analysis
+                summary.bookings = None
@@ -0,0 +1,109 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileCache:
+    """Per-user content profile vectors in a model snapshot's TF-IDF feature space.
+
+    A profile is the weighted sum of the feature-matrix rows of the hotels a
+    user interacted with, plus the TF-IDF vectors of their preferred cities,
+    types, amenities and travel style, normalized to unit length. Entries are
+    tied to the model version they were built with and expire after a TTL or
+    when the user's new interactions are ingested.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 900):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._cache = OrderedDict()
+        self._term_vectors = {}
+        self._terms_version = None
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, model_version: str) -> Tuple[bool, Optional[np.ndarray]]:
+        """(found, profile) for a user; a found profile may be None for users with no signal"""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None or entry[1] != model_version or time.monotonic() - entry[0] >= self.ttl_seconds:
+                return False, None
+            self._cache.move_to_end(user_id)
+            return True, entry[2]
+
+    def put(self, user_id: str, model_version: str, profile: Optional[np.ndarray]):
+        with self._lock:
+            self._cache[user_id] = (time.monotonic(), model_version, profile)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, user_ids: Optional[Iterable[str]] = None):
+        """Drop the given users' profiles, or every profile if no ids are given"""
+        with self._lock:
+            if user_ids is None:
+                self._cache.clear()
+                return
+            for user_id in user_ids:
+                self._cache.pop(str(user_id), None)
+
+    def build(self, snapshot, preferences: Optional[Dict], recent_interactions: List[Dict]) -> Optional[np.ndarray]:
+        """Profile vector from already fetched preferences and interactions, or None if there is no signal"""
+        rows = []
+        weights = []
+        for interaction in recent_interactions:
+            row = snapshot.hotel_index.get(str(interaction['hotelId']))
+            if row is not None:
+                rows.append(row)
+                weights.append(3.0 if interaction.get('interactionType') == 'booking' else 1.0)
+
+        profile = np.zeros(snapshot.hotel_features_matrix.shape[1])
+        if rows:
+            # Weighted sum of the hotels' feature rows, without re-tokenizing their content
+            profile += snapshot.hotel_features_matrix[rows].T.dot(np.asarray(weights))
+
+        # Each preference counts like an interaction with a hotel described by that one term
+        for term, weight in self._preference_terms(preferences):
+            profile += weight * self._term_vector(snapshot, term)
+
+        norm = np.linalg.norm(profile)
+        if norm == 0:
+            return None
+        return (profile / norm).astype(np.float32)
+
+    @staticmethod
+    def _preference_terms(preferences: Optional[Dict]) -> List[Tuple[str, float]]:
+        if not preferences:
+            return []
+
+        terms = []
+        for city_pref in preferences.get('preferredCities', []):
+            terms.append((city_pref.get('city', ''), float(city_pref.get('weight', 1))))
+        for type_pref in preferences.get('preferredHotelTypes', []):
+            terms.append((type_pref.get('type', ''), float(type_pref.get('weight', 1))))
+        for amenity_pref in preferences.get('preferredAmenities', []):
+            terms.append((amenity_pref.get('amenity', ''), float(amenity_pref.get('importance', 1))))
+        if preferences.get('travelStyle'):
+            terms.append((preferences['travelStyle'], 3.0))
+
+        return [(term, weight) for term, weight in terms if term]
+
+    def _term_vector(self, snapshot, term: str) -> np.ndarray:
+        """TF-IDF vector of a single preference term, memoized per model version"""
+        with self._lock:
+            if self._terms_version != snapshot.version:
+                self._term_vectors = {}
+                self._terms_version = snapshot.version
+            vector = self._term_vectors.get(term)
+
+        if vector is None:
+            vector = snapshot.tfidf_vectorizer.transform([term]).toarray()[0]
+            with self._lock:
+                if self._terms_version == snapshot.version:
+                    self._term_vectors[term] = vector
+        return vector